@@ -0,0 +1,285 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+import aiohttp
+
+from failures import RetryPolicy
+from http_engine import USER_AGENT, parse_detail_page, parse_list_page, parse_pagination
+from metrics import metrics
+from pacing import Pacer, THROTTLE_STATUSES, parse_retry_after
+from parsing import build_row, empty_detail, list_page_url
+
+
+class PageRecord:
+    """A list page whose cards are moving through the detail stages."""
+
+    def __init__(self, page_number, cards):
+        self.page_number = page_number
+        self.cards = cards
+        self.results = [None] * len(cards)
+        self.remaining = len(cards)
+
+
+class AsyncPipeline:
+    """Fetch, parse and write as separate asyncio stages joined by bounded queues.
+
+    page numbers -> list fetchers -> list parser -> detail fetchers -> detail
+    parsers -> writer. Fetching is non-blocking aiohttp; lxml parsing runs in a
+    thread pool so the event loop keeps the connections busy meanwhile, and
+    the writer hands finished pages to the sink off the loop as well. Every
+    queue is bounded, so a slow stage holds back the ones before it instead of
+    letting pages pile up in memory.
+    """
+
+    def __init__(self, start_url, sink, cache=None, pacer=None, detail_workers=8, list_workers=2,
+                 parse_workers=2, timeout=20, retries=3, queue_size=64, policy=None):
+        self.start_url = start_url
+        self.sink = sink
+        self.cache = cache
+        self.pacer = pacer if pacer is not None else Pacer()
+        self.detail_workers = detail_workers
+        self.list_workers = list_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.queue_size = queue_size
+        self.parse_executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="parse")
+        self.io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write")
+        self.given_up = []
+        self.attempts = {}
+        # Page 1 as fetched by get_total_pages, handed to the list parser
+        # instead of being fetched a second time.
+        self._first_page = None
+
+    async def fetch(self, url, phase):
+        with metrics.timer(phase, url=url) as span:
+            return await self._fetch(url, span)
+
+    async def _fetch(self, url, span=None):
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            cached = await loop.run_in_executor(None, self.cache.get, url)
+            if cached is not None:
+                return cached
+        for attempt in range(self.retries + 1):
+            delay = max(self.pacer.reserve(), 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            metrics.pacer_wait(delay, span)
+            started = time.monotonic()
+            try:
+                async with self.session.get(url) as response:
+                    body = await response.read()
+                    status = response.status
+                    retry_after = response.headers.get("Retry-After")
+                    final_url = str(response.url)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                if attempt == self.retries:
+                    raise
+                backoff = self.pacer.throttled()
+                print(f"[WARNING] {type(e).__name__} for {url}, backing off {backoff:.1f}s.")
+                continue
+            if status in THROTTLE_STATUSES and attempt < self.retries:
+                backoff = self.pacer.throttled(parse_retry_after(retry_after))
+                print(f"[WARNING] HTTP {status} for {url}, backing off {backoff:.1f}s.")
+                continue
+            if status >= 400:
+                raise RuntimeError(f"HTTP {status} for {url}")
+            self.pacer.success(time.monotonic() - started)
+            if self.cache is not None:
+                await loop.run_in_executor(None, self.cache.put, url, body, final_url)
+            return body, final_url
+
+    async def parse(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.parse_executor, func, *args)
+
+    async def get_total_pages(self):
+        """Page count retried within the policy; None once the attempts are used up."""
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                self._first_page = await self.fetch(self.start_url, "fetch")
+                return await self.parse(parse_pagination, *self._first_page)
+            except Exception as e:
+                self._first_page = None
+                if not self.policy.should_retry(attempts):
+                    print(f"[CRITICAL] Could not determine total pages after {attempts} attempts: {type(e).__name__}: {e}")
+                    return None
+                print(f"[WARNING] Could not determine total pages (attempt {attempts}), retrying: {e}")
+                await asyncio.sleep(self.policy.delay(attempts))
+
+    async def list_fetcher(self):
+        while True:
+            page_number = await self.pages.get()
+            try:
+                fetched = None
+                if page_number == 1:
+                    fetched, self._first_page = self._first_page, None
+                if fetched is None:
+                    fetched = await self.fetch(list_page_url(self.start_url, page_number), "list_page_load")
+            except Exception as e:
+                attempts = self.attempts[page_number] = self.attempts.get(page_number, 0) + 1
+                reason = f"{type(e).__name__}: {e}"
+                if not self.policy.should_retry(attempts):
+                    print(f"[ERROR] Giving up on page {page_number} after {attempts} attempts: {reason}")
+                    await self.in_executor(self.sink.page_failed, page_number, reason, attempts)
+                    self.given_up.append(page_number)
+                else:
+                    print(f"[WARNING] Page {page_number} failed (attempt {attempts}), retrying: {e}")
+                    metrics.incr("page_retries")
+                    await asyncio.sleep(self.policy.delay(attempts))
+                    self.pages.put_nowait(page_number)
+            else:
+                await self.list_bodies.put((page_number, fetched))
+            finally:
+                self.pages.task_done()
+
+    async def list_parser(self):
+        while True:
+            page_number, (body, final_url) = await self.list_bodies.get()
+            try:
+                with metrics.timer("card_extraction", page=page_number):
+                    cards = await self.parse(parse_list_page, body, final_url)
+                print(f"[DEBUG] Found {len(cards)} cards on page {page_number}.")
+                skipped = [card_info for card_info in cards if self.sink.skip_card(card_info)]
+                if skipped:
+                    print(f"[INFO] Skipping {len(skipped)} organisations on page {page_number} already saved by a previous run.")
+                    cards = [card_info for card_info in cards if not self.sink.skip_card(card_info)]
+                record = PageRecord(page_number, cards)
+                if not cards:
+                    await self.finished.put(record)
+                for index, card_info in enumerate(cards):
+                    await self.cards.put((record, index, card_info))
+            except Exception as e:
+                print(f"[ERROR] Could not parse page {page_number}: {e}")
+                await self.in_executor(self.sink.page_failed, page_number, f"{type(e).__name__}: {e}", 1)
+                self.given_up.append(page_number)
+            finally:
+                self.list_bodies.task_done()
+
+    async def detail_fetcher(self):
+        while True:
+            record, index, card_info = await self.cards.get()
+            try:
+                company_name = card_info['company_name_list_view']
+                details_link = card_info['details_link']
+                previous_row = self.sink.previous_row(card_info)
+                if previous_row is not None:
+                    print(f"[DEBUG] Unchanged since last run, reusing row: {company_name}")
+                    await self.card_done(record, index, card_info, previous_row, True)
+                elif details_link and details_link.startswith("http"):
+                    print(f"[DEBUG] Processing organization: {company_name} (Link: {details_link})")
+                    started = time.monotonic()
+                    fetched = await self.fetch_detail(record, card_info)
+                    if fetched is None:
+                        await self.card_done(record, index, card_info, None, False)
+                    else:
+                        await self.detail_bodies.put((record, index, card_info, fetched, started))
+                else:
+                    print(f"[DEBUG] Not visiting detail page for {company_name}. No valid link.")
+                    await self.card_done(record, index, card_info, build_row(card_info, empty_detail()), False)
+            finally:
+                self.cards.task_done()
+
+    async def detail_parser(self):
+        while True:
+            record, index, card_info, (body, final_url), started = await self.detail_bodies.get()
+            try:
+                with metrics.timer("detail_extraction"):
+                    detail = await self.parse(parse_detail_page, body, final_url)
+                metrics.observe("detail_total", time.monotonic() - started, ok=True, url=card_info['details_link'])
+                await self.card_done(record, index, card_info, build_row(card_info, detail), False)
+            except Exception as e:
+                # A page that does not parse won't parse the next time either.
+                print(f"[ERROR] General error processing card {card_info['company_name_list_view']}: {e}")
+                await self.in_executor(self.sink.card_failed, record.page_number, card_info, f"{type(e).__name__}: {e}", 1)
+                await self.card_done(record, index, card_info, None, False)
+            finally:
+                self.detail_bodies.task_done()
+
+    async def fetch_detail(self, record, card_info):
+        """Detail page body within the retry budget; None once it is dead-lettered."""
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                return await self.fetch(card_info['details_link'], "detail_navigation")
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                if not self.policy.should_retry(attempts):
+                    print(f"[ERROR] Giving up on {card_info['company_name_list_view']} after {attempts} attempts: {reason}")
+                    await self.in_executor(self.sink.card_failed, record.page_number, card_info, reason, attempts)
+                    return None
+                print(f"[WARNING] Error processing card {card_info['company_name_list_view']} (attempt {attempts}), retrying: {e}")
+                metrics.incr("detail_retries")
+                await asyncio.sleep(self.policy.delay(attempts))
+
+    async def in_executor(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, func, *args)
+
+    async def card_done(self, record, index, card_info, row, carried_over):
+        record.results[index] = (card_info, row, carried_over)
+        record.remaining -= 1
+        if record.remaining == 0:
+            await self.finished.put(record)
+
+    async def writer(self):
+        while True:
+            record = await self.finished.get()
+            try:
+                await self.in_executor(self.sink.page_done, record.page_number, record.results)
+            finally:
+                self.finished.task_done()
+
+    async def run(self, max_pages=None):
+        """Scrape every page; returns True if nothing was skipped or given up."""
+        self.pages = asyncio.Queue()
+        self.list_bodies = asyncio.Queue(maxsize=self.list_workers)
+        self.cards = asyncio.Queue(maxsize=self.queue_size)
+        self.detail_bodies = asyncio.Queue(maxsize=self.queue_size)
+        self.finished = asyncio.Queue(maxsize=self.queue_size)
+
+        connector = aiohttp.TCPConnector(limit=self.list_workers + self.detail_workers)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={"User-Agent": USER_AGENT}) as self.session:
+            with metrics.timer("get_total_pages"):
+                total_pages = await self.get_total_pages()
+            if total_pages is None:
+                total_pages, limited = 1, True
+                print("[WARNING] Scraping page 1 only; the run will not count as complete.")
+            else:
+                print(f"[INFO] Total pages to scrape: {total_pages}")
+                limited = max_pages is not None and max_pages < total_pages
+                if limited:
+                    total_pages = max_pages
+                    print(f"[INFO] Limiting parsing to the first {total_pages} pages.")
+            for page_number in range(1, total_pages + 1):
+                if not self.sink.skip_page(page_number):
+                    self.pages.put_nowait(page_number)
+            print(f"[INFO] {self.pages.qsize()} pages left to scrape.")
+
+            stages = [self.list_fetcher() for _ in range(self.list_workers)]
+            stages += [self.list_parser()]
+            stages += [self.detail_fetcher() for _ in range(self.detail_workers)]
+            stages += [self.detail_parser() for _ in range(self.detail_workers)]
+            stages += [self.writer()]
+            tasks = [asyncio.create_task(stage) for stage in stages]
+            try:
+                # Drain the stages front to back; a page retry re-enters the
+                # first queue, so it is joined before the later ones.
+                for stage_queue in (self.pages, self.list_bodies, self.cards, self.detail_bodies, self.finished):
+                    await stage_queue.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.parse_executor.shutdown(wait=True)
+                self.io_executor.shutdown(wait=True)
+        return not self.given_up and not limited
+
+
+def run_async_pipeline(start_url, sink, max_pages=None, **kwargs):
+    return asyncio.run(AsyncPipeline(start_url, sink, **kwargs).run(max_pages=max_pages))
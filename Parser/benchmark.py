@@ -0,0 +1,174 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+
+from fixture_server import start_server
+from metrics import Histogram
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RSS_SAMPLE_INTERVAL = 0.1
+
+
+def tree_rss(pid):
+    """Resident memory in bytes of a process and all of its descendants."""
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def read_phase_latencies(metrics_path):
+    histograms = {}
+    with open(metrics_path, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            histograms.setdefault(event["phase"], Histogram()).add(event["seconds"])
+    return histograms
+
+
+def run_scenario(name, start_url, extra_args, workdir):
+    """Run main.py end to end in a child process and measure it."""
+    metrics_path = os.path.join(workdir, f"{name}.metrics.jsonl")
+    output_path = os.path.join(workdir, f"{name}.csv")
+    command = [
+        sys.executable, os.path.join(HERE, "main.py"),
+        "--start-url", start_url,
+        "--output", output_path,
+        "--checkpoint", os.path.join(workdir, f"{name}.checkpoint.jsonl"),
+        "--state", os.path.join(workdir, f"{name}.state.jsonl"),
+        "--changes", os.path.join(workdir, f"{name}.changes.csv"),
+        "--dead-letter", os.path.join(workdir, f"{name}.failed.jsonl"),
+        "--metrics", metrics_path,
+        "--max-rps", "100000",
+    ] + extra_args
+
+    started = time.monotonic()
+    with open(os.path.join(workdir, f"{name}.log"), "w", encoding="utf-8") as log:
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, cwd=HERE)
+        # Chrome and chromedriver are grandchildren, so sample the whole tree;
+        # wait4's ru_maxrss still catches a short peak of the Python process.
+        tree_peak = 0
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            tree_peak = max(tree_peak, tree_rss(process.pid))
+            time.sleep(RSS_SAMPLE_INTERVAL)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.monotonic() - started
+
+    with open(output_path, encoding="utf-8") as f:
+        rows = sum(1 for _ in csv.DictReader(f))
+    histograms = read_phase_latencies(metrics_path)
+    pages = histograms["list_page_load"].count + 1 if "list_page_load" in histograms else 1
+    detail = histograms.get("detail_total", Histogram())
+    return {
+        "scenario": name,
+        "exit_code": process.returncode,
+        "seconds": round(elapsed, 3),
+        "rows": rows,
+        "rows_per_second": round(rows / elapsed, 2),
+        "pages_per_minute": round(pages / elapsed * 60, 1),
+        "detail_p50_ms": round(detail.percentile(50) * 1000, 1),
+        "detail_p95_ms": round(detail.percentile(95) * 1000, 1),
+        "peak_rss_mb": round(max(tree_peak, usage.ru_maxrss * 1024) / 1024 / 1024, 1),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {entry["scenario"]: entry for entry in json.load(f)}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["scenario"])
+        if previous is None:
+            continue
+        if result["rows_per_second"] < previous["rows_per_second"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: {result['rows_per_second']} rows/s, "
+                               f"baseline {previous['rows_per_second']}")
+        if result["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: peak RSS {result['peak_rss_mb']} MB, "
+                               f"baseline {previous['peak_rss_mb']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scraper end to end against a local fixture server and measure it.")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--cards-per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the fixture server adds to each response")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--engine", action="append", choices=["http", "async", "selenium"],
+                        help="engine(s) to benchmark; default http")
+    parser.add_argument("--detail-workers", type=int, action="append",
+                        help="detail worker counts to benchmark; default 1 and 8")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="write the results to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if slower or bigger than a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against --baseline")
+    parser.add_argument("--keep", action="store_true", help="keep the scenario outputs and logs")
+    args = parser.parse_args(argv)
+
+    server, start_url = start_server(pages=args.pages, cards_per_page=args.cards_per_page,
+                                     latency=args.latency, jitter=args.jitter)
+    print(f"[INFO] Fixture server: {args.pages} pages x {args.cards_per_page} cards, "
+          f"{args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms latency at {start_url}")
+
+    workdir = tempfile.mkdtemp(prefix="awo-bench-")
+    results = []
+    try:
+        for engine in args.engine or ["http"]:
+            for workers in args.detail_workers or [1, 8]:
+                name = f"{engine}-w{workers}-p{args.pool_size}"
+                print(f"[INFO] Running {name} ...")
+                result = run_scenario(name, start_url, [
+                    "--engine", engine, "--detail-workers", str(workers), "--pool-size", str(args.pool_size),
+                ], workdir)
+                results.append(result)
+                if result["exit_code"] != 0:
+                    print(f"[ERROR] {name} exited with {result['exit_code']}, see {workdir}/{name}.log")
+    finally:
+        server.shutdown()
+
+    columns = ["scenario", "seconds", "rows", "rows_per_second", "pages_per_minute",
+               "detail_p50_ms", "detail_p95_ms", "peak_rss_mb"]
+    print("  ".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print("  ".join(f"{result[column]!s:>16}" for column in columns))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.keep:
+        print(f"[INFO] Scenario outputs kept in {workdir}")
+    else:
+        shutil.rmtree(workdir)
+
+    expected_rows = args.pages * args.cards_per_page
+    failed = [r["scenario"] for r in results if r["exit_code"] != 0 or r["rows"] != expected_rows]
+    if failed:
+        print(f"[ERROR] Scenarios without the expected {expected_rows} rows: {', '.join(failed)}")
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    for regression in regressions:
+        print(f"[ERROR] Performance regression: {regression}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import json
+import os
+import threading
+
+
+class Checkpoint:
+    """Append-only record of finished list pages and detail URLs.
+
+    Each line is a JSON object written right after the page's rows were
+    flushed to the output file, along with the writer's `offset` at that
+    point. Rows a killed run wrote after the last recorded offset belong to
+    pages that will be scraped again, so `offset` is where the output is
+    cut back to on resume (None for a checkpoint without offsets).
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.pages = set()
+        self.details = set()
+        self.offset = None
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self.offset = 0
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash mid-write.
+                        continue
+                    self.pages.add(entry["page"])
+                    self.details.update(entry.get("details", []))
+                    self.offset = entry.get("offset")
+            print(f"[INFO] Resuming: {len(self.pages)} pages and {len(self.details)} detail pages already done.")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def page_done(self, page_number):
+        return page_number in self.pages
+
+    def detail_done(self, details_link):
+        return details_link in self.details
+
+    def mark_page(self, page_number, details_links, offset=None):
+        with self._lock:
+            self.pages.add(page_number)
+            self.details.update(details_links)
+            self.offset = offset
+            self._file.write(json.dumps({"page": page_number, "details": details_links, "offset": offset}) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
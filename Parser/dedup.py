@@ -0,0 +1,91 @@
+import argparse
+import csv
+import os
+
+from parsing import FIELDNAMES, flat_row, row_from_record
+
+
+def normalise_domain(domain):
+    domain = (domain or "").strip().lower().rstrip(".")
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return "" if domain == "-" else domain
+
+
+class Deduplicator:
+    """In-memory indexes over the rows of a run, all dict/set based so the pass stays O(n).
+
+    Rows are identified by their `details_link` when there is one, otherwise
+    by normalised name within their postal code. Every kept row is also
+    indexed under its website and email domain for the domain table.
+    """
+
+    def __init__(self):
+        self.links = set()
+        self.by_postal_code = {}
+        self.by_domain = {}
+        self.duplicates = 0
+
+    def seen_link(self, details_link):
+        return bool(details_link) and details_link in self.links
+
+    def add(self, row, details_link=None):
+        """Index `row`; returns False if it duplicates a row already added."""
+        if details_link:
+            if details_link in self.links:
+                self.duplicates += 1
+                return False
+            self.links.add(details_link)
+        else:
+            names = self.by_postal_code.setdefault(row.postal_code, set())
+            key = (" ".join(row.company_name.lower().split()), row.street_address)
+            if key in names:
+                self.duplicates += 1
+                return False
+            names.add(key)
+
+        for domain in {normalise_domain(row.company_domain), normalise_domain(row.email_domain)}:
+            if domain:
+                self.by_domain.setdefault(domain, []).append(row.company_name)
+        return True
+
+    def write_domains(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["domain", "organisations", "names"])
+            for domain, names in sorted(self.by_domain.items(), key=lambda item: (-len(item[1]), item[0])):
+                writer.writerow([domain, len(names), "; ".join(names)])
+        return len(self.by_domain)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drop duplicate organisations from a scraped CSV and group them by domain.")
+    parser.add_argument("input", help="CSV written by main.py")
+    parser.add_argument("--output", help="deduplicated CSV (default: <input>.dedup.csv)")
+    parser.add_argument("--domains", help="domain -> organisations table (default: <input>.domains.csv)")
+    args = parser.parse_args(argv)
+
+    stem = args.input[:-4] if args.input.endswith(".csv") else args.input
+    output = args.output or stem + ".dedup.csv"
+    domains = args.domains or stem + ".domains.csv"
+
+    dedup = Deduplicator()
+    kept = 0
+    with open(args.input, newline="", encoding="utf-8") as src, open(output, "w", newline="", encoding="utf-8") as dst:
+        writer = csv.writer(dst)
+        writer.writerow(FIELDNAMES)
+        for record in csv.DictReader(src):
+            row = row_from_record(record)
+            if dedup.add(row):
+                writer.writerow(flat_row(row))
+                kept += 1
+
+    print(f"[INFO] Kept {kept} rows, dropped {dedup.duplicates} duplicates -> {output}")
+    print(f"[INFO] {dedup.write_domains(domains)} domains -> {domains}")
+
+
+if __name__ == "__main__":
+    main()
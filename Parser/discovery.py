@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urljoin, urlparse
+
+import lxml.etree
+
+from metrics import metrics
+from parsing import build_row, empty_detail
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def sitemap_urls(engine, sitemap_url, depth=0):
+    """Every <loc> in a sitemap, following sitemap indexes one level deep."""
+    with metrics.timer("sitemap", url=sitemap_url):
+        root = lxml.etree.fromstring(engine.get(sitemap_url).content)
+    locs = [loc.text.strip() for loc in root.iter(SITEMAP_NS + "loc", "loc") if loc.text]
+    if root.tag.endswith("sitemapindex"):
+        if depth > 0:
+            return []
+        return [url for child in locs for url in sitemap_urls(engine, child, depth + 1)]
+    return locs
+
+
+def detail_urls_from_sitemap(engine, start_url, sitemap_url=None):
+    """Detail page URLs listed in the site's sitemap: everything below the search page's path."""
+    sitemap_url = sitemap_url or urljoin(start_url, "/sitemap.xml")
+    search = urlparse(start_url)
+    prefix = search.path.rstrip("/") + "/"
+    try:
+        urls = sitemap_urls(engine, sitemap_url)
+    except Exception as e:
+        print(f"[WARNING] Could not read sitemap {sitemap_url}: {e}")
+        return []
+    detail_urls = [url for url in dict.fromkeys(urls)
+                   if urlparse(url).netloc == search.netloc and urlparse(url).path.startswith(prefix)]
+    print(f"[INFO] Sitemap {sitemap_url} lists {len(detail_urls)} detail pages.")
+    return detail_urls
+
+
+class Discovery:
+    """Start detail pages without walking the list pages first.
+
+    Detail URLs from the sitemap go to the detail pool straight away, while
+    every list page is fetched in parallel on a separate pool. As list pages
+    come in, their cards are joined to the detail results by URL (cards the
+    sitemap missed get their detail fetch queued then), and a page goes to
+    the sink as soon as all of its details are done. URLs the previous
+    `--incremental` state knows wait for their card, whose fingerprint
+    decides whether the old row is reused. Without a sitemap this is still
+    a flat parallel fan-out over every list page.
+    """
+
+    def __init__(self, engine, sink, policy, detail_workers=4, list_workers=4):
+        self.engine = engine
+        self.sink = sink
+        self.policy = policy
+        self.detail_executor = ThreadPoolExecutor(max_workers=max(1, detail_workers), thread_name_prefix="detail")
+        self.list_executor = ThreadPoolExecutor(max_workers=max(1, list_workers), thread_name_prefix="list")
+        self.details = {}
+
+    def fetch_detail(self, card_info):
+        """(detail, None, attempts) or, once the retry budget is used up, (None, reason, attempts)."""
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                with metrics.timer("detail_total", url=card_info['details_link']):
+                    return self.engine.fetch_detail(card_info), None, attempts
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                if not self.policy.should_retry(attempts):
+                    return None, reason, attempts
+                print(f"[WARNING] Error fetching {card_info['details_link']} (attempt {attempts}), retrying: {e}")
+                metrics.incr("detail_retries")
+                self.policy.backoff(attempts)
+
+    def submit_detail(self, details_link, company_name=""):
+        future = self.details.get(details_link)
+        if future is None:
+            card_info = {'details_link': details_link, 'company_name_list_view': company_name}
+            future = self.details[details_link] = self.detail_executor.submit(self.fetch_detail, card_info)
+        return future
+
+    def extract_cards(self, page_number):
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                cards = self.engine.extract_cards(page_number)
+                if cards is None:
+                    raise RuntimeError(f"page {page_number} went stale while reading its cards")
+                return cards, None, attempts
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+                if not self.policy.should_retry(attempts):
+                    return None, reason, attempts
+                print(f"[WARNING] Page {page_number} failed (attempt {attempts}), retrying: {e}")
+                metrics.incr("page_retries")
+                self.policy.backoff(attempts)
+
+    def join_page(self, page_number, cards):
+        """Resolve each card to a row source: a reused row, a link-less row or a detail future."""
+        joined = []
+        for card_info in cards:
+            if self.sink.skip_card(card_info):
+                continue
+            details_link = card_info['details_link']
+            previous_row = self.sink.previous_row(card_info)
+            if previous_row is not None:
+                joined.append((card_info, previous_row, True, None))
+            elif details_link and details_link.startswith("http"):
+                joined.append((card_info, None, False, self.submit_detail(details_link, card_info['company_name_list_view'])))
+            else:
+                joined.append((card_info, build_row(card_info, empty_detail()), False, None))
+        return joined
+
+    def finish_page(self, page_number, joined):
+        results = []
+        for card_info, row, carried_over, future in joined:
+            if future is not None:
+                detail, reason, attempts = future.result()
+                if detail is None:
+                    print(f"[ERROR] Giving up on {card_info['company_name_list_view']} after {attempts} attempts: {reason}")
+                    self.sink.card_failed(page_number, card_info, reason, attempts)
+                else:
+                    row = build_row(card_info, detail)
+            results.append((card_info, row, carried_over))
+        self.sink.page_done(page_number, results)
+
+    def run(self, total_pages, detail_urls=()):
+        """Scrape every page not done yet; returns the pages that were given up on."""
+        for details_link in detail_urls:
+            if not self.sink.skip_prefetch(details_link):
+                self.submit_detail(details_link)
+        if self.details:
+            print(f"[INFO] Started {len(self.details)} detail pages from the sitemap.")
+
+        page_numbers = [page_number for page_number in range(1, total_pages + 1) if not self.sink.skip_page(page_number)]
+        print(f"[INFO] Fetching {len(page_numbers)} list pages in parallel.")
+        list_futures = {self.list_executor.submit(self.extract_cards, page_number): page_number
+                        for page_number in page_numbers}
+        given_up = []
+        pending = []
+        linked = set()
+        try:
+            for list_future in as_completed(list_futures):
+                page_number = list_futures[list_future]
+                cards, reason, attempts = list_future.result()
+                if cards is None:
+                    print(f"[ERROR] Giving up on page {page_number} after {attempts} attempts: {reason}")
+                    self.sink.page_failed(page_number, reason, attempts)
+                    given_up.append(page_number)
+                    continue
+                joined = self.join_page(page_number, cards)
+                linked.update(card_info['details_link'] for card_info in cards)
+                pending.append((page_number, joined))
+                # Hand over every page whose details are all in, in whatever order they finished.
+                still_pending = []
+                for page in pending:
+                    if all(future is None or future.done() for _, _, _, future in page[1]):
+                        self.finish_page(*page)
+                    else:
+                        still_pending.append(page)
+                pending = still_pending
+
+            for page_number, joined in sorted(pending):
+                self.finish_page(page_number, joined)
+        finally:
+            self.list_executor.shutdown(wait=True)
+            orphans = [future for details_link, future in self.details.items() if details_link not in linked]
+            if orphans and not given_up:
+                print(f"[WARNING] {len(orphans)} sitemap detail pages are on no list page; they are not written.")
+            for future in orphans:
+                future.cancel()
+            wait(self.details.values())
+            self.detail_executor.shutdown(wait=True)
+        return given_up
@@ -0,0 +1,325 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from failures import RetryPolicy
+from metrics import metrics
+from parsing import build_row, empty_detail, row_from_record
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Page and detail tasks shared by a coordinator and any number of workers.
+
+    The queue is one SQLite file on a volume every node mounts. A worker
+    claims a task by leasing it for `lease_seconds`; a task whose lease ran
+    out (its worker crashed or hung) is handed to the next worker that asks,
+    and from then on only the new lease holder can finish it. Ids are never
+    reused, not even after `reset`, so a stale worker can't finish a task of
+    the next crawl.
+    Page tasks expand into one detail task per card, and detail tasks carry
+    the finished row back, so the coordinator can merge pages from the
+    queue alone. Each thread uses its own connection.
+    """
+
+    def __init__(self, path, lease_seconds=120, policy=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.policy = policy if policy is not None else RetryPolicy()
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0,
+                payload TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                UNIQUE (kind, page, position)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until);
+            CREATE INDEX IF NOT EXISTS tasks_page ON tasks (page, kind);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    @property
+    def db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit mode; writes that must be atomic open their own
+            # BEGIN IMMEDIATE so two nodes can never claim the same task.
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def _transaction(self, func, *args):
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(db, *args)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return result
+
+    # Coordinator side
+
+    def reset(self, fresh=True):
+        """Start a coordinator run: workers wait for the next `seed` instead of
+        taking the finished queue of an earlier run for a drained one.
+        `fresh=False` keeps the tasks of an interrupted crawl."""
+        def reset(db):
+            db.execute("DELETE FROM meta WHERE key = 'seeded'")
+            if fresh:
+                db.execute("DELETE FROM tasks")
+        self._transaction(reset)
+
+    def seed(self, page_numbers):
+        """Queue a page task per page not queued yet; workers stop once these are all finished."""
+        def seed(db):
+            db.executemany("INSERT OR IGNORE INTO tasks (kind, page) VALUES ('page', ?)",
+                           [(page_number,) for page_number in page_numbers])
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seeded', ?)", (str(time.time()),))
+        self._transaction(seed)
+
+    def mergeable_pages(self):
+        """Pages whose list and detail tasks are all finished but which were not merged yet."""
+        return [page for (page,) in self.db.execute("""
+            SELECT page FROM tasks AS p WHERE kind = 'page' AND state = 'done' AND NOT EXISTS (
+                SELECT 1 FROM tasks AS d
+                WHERE d.kind = 'detail' AND d.page = p.page AND d.state IN ('pending', 'leased'))
+            ORDER BY page
+        """)]
+
+    def page_results(self, page_number):
+        """(card_info, row, carried_over) per card of the page, row None for failed details."""
+        results = []
+        for payload, result in self.db.execute(
+                "SELECT payload, result FROM tasks WHERE kind = 'detail' AND page = ? ORDER BY position", (page_number,)):
+            card_info = json.loads(payload)
+            card_info['tags_list_view'] = tuple(card_info['tags_list_view'])
+            row = row_from_record(json.loads(result)) if result is not None else None
+            results.append((card_info, row, False))
+        return results
+
+    def mark_merged(self, page_number):
+        self.db.execute("UPDATE tasks SET state = 'merged' WHERE kind = 'page' AND page = ?", (page_number,))
+
+    def failed_details(self, page_number):
+        """(card_info, error, attempts) of the page's detail tasks that were given up on."""
+        failed = []
+        for payload, error, attempts in self.db.execute(
+                "SELECT payload, error, attempts FROM tasks WHERE kind = 'detail' AND page = ? AND state = 'failed' "
+                "ORDER BY position", (page_number,)):
+            card_info = json.loads(payload)
+            card_info['tags_list_view'] = tuple(card_info['tags_list_view'])
+            failed.append((card_info, error, attempts))
+        return failed
+
+    def failed_pages(self):
+        """(page, error, attempts) of the page tasks that were given up on."""
+        return self.db.execute(
+            "SELECT page, error, attempts FROM tasks WHERE kind = 'page' AND state = 'failed' ORDER BY page").fetchall()
+
+    def counts(self):
+        return dict(self.db.execute("SELECT kind || ':' || state, COUNT(*) FROM tasks GROUP BY kind, state"))
+
+    # Worker side
+
+    def seeded(self):
+        """When the current crawl was seeded, or None before its coordinator got that far."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'seeded'").fetchone()
+        return row[0] if row is not None else None
+
+    def unfinished(self):
+        return self.db.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def claim(self, worker_id):
+        """Lease the next available task; returns (id, kind, page, payload) or None.
+
+        Detail tasks go first so pages finish (and can be merged) before new
+        ones are opened.
+        """
+        def claim(db):
+            now = time.time()
+            task = db.execute("""
+                SELECT id, kind, page, payload, state FROM tasks
+                WHERE state IN ('pending', 'leased') AND lease_until <= ?
+                ORDER BY kind = 'page', page, position LIMIT 1
+            """, (now,)).fetchone()
+            if task is None:
+                return None
+            if task[4] == "leased":
+                print(f"[WARNING] Lease on {task[1]} task {task[0]} (page {task[2]}) expired, reassigning it.")
+            db.execute("UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                       (worker_id, now + self.lease_seconds, task[0]))
+            return task[:4]
+        return self._transaction(claim)
+
+    def expand(self, task_id, worker_id, page_number, cards):
+        """Finish a page task by queueing a detail task for each of its cards."""
+        def expand(db):
+            # A task this worker no longer holds (its lease went to another
+            # worker, or a new run cleared the queue) must not add details.
+            if db.execute("UPDATE tasks SET state = 'done', result = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+                          (str(len(cards)), task_id, worker_id)).rowcount == 0:
+                return
+            db.executemany("INSERT OR IGNORE INTO tasks (kind, page, position, payload) VALUES ('detail', ?, ?, ?)",
+                           [(page_number, position, json.dumps(card_info, ensure_ascii=False))
+                            for position, card_info in enumerate(cards)])
+        self._transaction(expand)
+
+    def complete(self, task_id, worker_id, row):
+        self.db.execute("UPDATE tasks SET state = 'done', result = ? WHERE id = ? AND state = 'leased' AND worker = ?",
+                        (json.dumps(list(row), ensure_ascii=False), task_id, worker_id))
+
+    def fail(self, task_id, worker_id, error):
+        """Put the task back after the policy's backoff, or give up once it used all its attempts.
+
+        Returns True if the task was given up on, and None if the worker no
+        longer holds it (nothing to do then).
+        """
+        def fail(db):
+            task = db.execute("SELECT attempts FROM tasks WHERE id = ? AND state = 'leased' AND worker = ?",
+                              (task_id, worker_id)).fetchone()
+            if task is None:
+                return None
+            attempts = task[0]
+            if not self.policy.should_retry(attempts):
+                db.execute("UPDATE tasks SET state = 'failed', error = ? WHERE id = ?", (error, task_id))
+                return True
+            db.execute("UPDATE tasks SET state = 'pending', error = ?, lease_until = ? WHERE id = ?",
+                       (error, time.time() + self.policy.delay(attempts), task_id))
+            return False
+        return self._transaction(fail)
+
+
+def run_coordinator(work_queue, sink, total_pages, poll_interval=1.0):
+    """Queue every page not done yet and merge finished pages into `sink` until the queue drains.
+
+    `work_queue.reset` must have been called when the coordinator started.
+    Returns the pages that were given up on.
+    """
+    page_numbers = [page_number for page_number in range(1, total_pages + 1) if not sink.skip_page(page_number)]
+    work_queue.seed(page_numbers)
+    print(f"[INFO] Queued {len(page_numbers)} pages in {work_queue.path}; waiting for workers.")
+
+    last_report = 0
+    while True:
+        merged_any = False
+        for page_number in work_queue.mergeable_pages():
+            for card_info, error, attempts in work_queue.failed_details(page_number):
+                sink.card_failed(page_number, card_info, error, attempts)
+            sink.page_done(page_number, work_queue.page_results(page_number))
+            work_queue.mark_merged(page_number)
+            merged_any = True
+        unfinished = work_queue.unfinished()
+        if not unfinished and not work_queue.mergeable_pages():
+            break
+        if time.monotonic() - last_report > 30:
+            print(f"[INFO] Queue: {work_queue.counts()}")
+            last_report = time.monotonic()
+        if not merged_any:
+            time.sleep(poll_interval)
+
+    given_up = []
+    for page_number, error, attempts in work_queue.failed_pages():
+        print(f"[ERROR] Page {page_number} failed on every attempt: {error}")
+        sink.page_failed(page_number, error, attempts)
+        given_up.append(page_number)
+    print(f"[INFO] Queue drained: {work_queue.counts()}")
+    return given_up
+
+
+def process_task(engine, work_queue, task, worker_id):
+    task_id, kind, page_number, payload = task
+    if kind == "page":
+        print(f"\n[INFO] --- Parsing page {page_number} ---")
+        cards = engine.extract_cards(page_number)
+        if cards is None:
+            raise RuntimeError(f"page {page_number} went stale")
+        work_queue.expand(task_id, worker_id, page_number, cards)
+        return
+
+    card_info = json.loads(payload)
+    card_info['tags_list_view'] = tuple(card_info['tags_list_view'])
+    details_link = card_info['details_link']
+    print(f"[DEBUG] Processing organization: {card_info['company_name_list_view']} (Link: {details_link or 'N/A'})")
+    if details_link and details_link.startswith("http"):
+        with metrics.timer("detail_total", url=details_link):
+            detail = engine.fetch_detail(card_info)
+    else:
+        detail = empty_detail()
+    work_queue.complete(task_id, worker_id, build_row(card_info, detail))
+
+
+def run_worker(engine, work_queue, threads=1, worker_id=None, poll_interval=1.0):
+    """Take tasks from `work_queue` on `threads` threads until the crawl is finished.
+
+    A queue left drained by an earlier crawl does not count: the worker only
+    stops once it has seen tasks of a crawl, or a crawl seeded after it
+    started, so it can be started before the coordinator. A worker that
+    joins a crawl that already finished waits for the next one.
+    """
+    worker_id = worker_id or default_worker_id()
+    print(f"[INFO] Worker {worker_id} on {work_queue.path} with {threads} threads.")
+    active = threading.Event()
+    seeded_before = work_queue.seeded()
+
+    def worker(thread_id):
+        thread_worker_id = f"{worker_id}/{thread_id}"
+        while True:
+            task = work_queue.claim(thread_worker_id)
+            if task is None:
+                seeded = work_queue.seeded()
+                if work_queue.unfinished():
+                    active.set()
+                elif seeded is not None and (active.is_set() or seeded != seeded_before):
+                    work_queue.close()
+                    return
+                time.sleep(poll_interval)
+                continue
+            active.set()
+            try:
+                process_task(engine, work_queue, task, thread_worker_id)
+                metrics.incr(f"{task[1]}_tasks")
+            except Exception as e:
+                gave_up = work_queue.fail(task[0], thread_worker_id, f"{type(e).__name__}: {e}")
+                metrics.incr(f"{task[1]}_tasks_failed")
+                if gave_up is None:
+                    print(f"[WARNING] {task[1].capitalize()} task {task[0]} (page {task[2]}) failed after its lease "
+                          f"was lost: {e}")
+                    continue
+                print(f"[{'ERROR' if gave_up else 'WARNING'}] {task[1].capitalize()} task {task[0]} (page {task[2]}) "
+                      f"failed{', giving up' if gave_up else ', will retry'}: {e}")
+
+    if threads <= 1:
+        worker(0)
+        return
+    workers = [threading.Thread(target=worker, args=(i,), name=f"queue-worker-{i}") for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
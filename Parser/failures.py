@@ -0,0 +1,90 @@
+import json
+import os
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    """Per-task retry budget with exponential backoff.
+
+    A task gets `max_attempts` tries in total. After the n-th failure it
+    waits `base_delay * 2**(n-1)` seconds, capped at `max_delay` and
+    jittered by up to 10% so workers that failed together don't retry in
+    lockstep.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, attempts):
+        return attempts < self.max_attempts
+
+    def delay(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.9, 1.0)
+
+    def backoff(self, attempts):
+        time.sleep(self.delay(attempts))
+
+
+class DeadLetter:
+    """Append-only JSONL of tasks that used up their retry budget.
+
+    Detail entries keep the whole card so `--retry-failed` can fetch the
+    detail page again without its list page; page entries only need the
+    page number. With `replace=True` the entries go to `<path>.new`, which
+    replaces `path` on a finished close, so a retry run that is cut short
+    leaves the original list intact.
+    """
+
+    def __init__(self, path, append=False, replace=False):
+        self.path = path
+        self.replace = replace
+        self.count = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_path = path + ".new" if replace else path
+        self._file = open(self._write_path, "a" if append else "w", encoding="utf-8")
+
+    def record(self, kind, page_number, reason, attempts, card_info=None):
+        entry = {"kind": kind, "page": page_number, "reason": reason, "attempts": attempts, "time": time.time()}
+        if card_info is not None:
+            entry["details_link"] = card_info['details_link']
+            entry["card"] = dict(card_info, tags_list_view=list(card_info['tags_list_view']))
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self, finished=True):
+        if self._file.closed:
+            return
+        self._file.close()
+        if self.replace and finished:
+            os.replace(self._write_path, self.path)
+
+
+def load_dead_letters(path):
+    """Entries of a dead-letter file, cards restored; a missing file has none."""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if "card" in entry:
+                entry["card"]["tags_list_view"] = tuple(entry["card"]["tags_list_view"])
+            entries.append(entry)
+    return entries
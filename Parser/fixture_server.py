@@ -0,0 +1,162 @@
+import argparse
+import html
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LIST_PATH = "/organisations/public-search"
+DETAIL_PATH = "/organisations/public-search/view"
+SITEMAP_PATH = "/sitemap.xml"
+
+CITIES = ["Berlin", "Hamburg", "München", "Köln", "Frankfurt am Main", "Leipzig", "Dresden", "Bremen"]
+TAGS = ["Kindertagesstätte", "Seniorenzentrum", "Beratung", "Jugendhilfe", "Migration", "Pflege", "Ehrenamt"]
+STREETS = ["Hauptstraße", "Bahnhofstraße", "Schillerstraße", "Gartenweg", "Am Markt", "Lindenallee"]
+
+
+def organisation(org_id):
+    """Deterministic fake organisation, so every run sees the same site."""
+    rng = random.Random(org_id)
+    domain = f"awo-{rng.choice(['kv', 'ov', 'bv'])}-{org_id % 97}.de"
+    return {
+        "name": f"AWO {rng.choice(TAGS)} {org_id}",
+        "postal_code": f"{rng.randrange(1000, 99999):05d}",
+        "city": rng.choice(CITIES),
+        "street": f"{rng.choice(STREETS)} {rng.randrange(1, 200)}",
+        "tags": rng.sample(TAGS, rng.randrange(0, 4)),
+        "has_location": rng.random() > 0.05,
+        "website": f"https://www.{domain}/" if rng.random() > 0.2 else None,
+        "email": f"info@{domain}" if rng.random() > 0.15 else None,
+        "email_in_contact_box": rng.random() > 0.7,
+    }
+
+
+def list_page(page_number, pages, cards_per_page):
+    cards = []
+    for index in range(cards_per_page):
+        org_id = (page_number - 1) * cards_per_page + index + 1
+        org = organisation(org_id)
+        location = ""
+        if org["has_location"]:
+            location = f' <span class="add-loc-data">{org["postal_code"]} {html.escape(org["city"])}</span>'
+        badges = "".join(f'<span class="badge badge-pill badge-primary">{html.escape(tag)}</span>' for tag in org["tags"])
+        cards.append(f"""
+<div class="panel panel-primary">
+  <div class="panel-heading"><h3 class="panel-title">{html.escape(org["name"])}{location}</h3></div>
+  <div class="panel-body">{badges}<div class="detail-link"><a href="{DETAIL_PATH}?id={org_id}">Details</a></div></div>
+</div>""")
+    return f"""<!DOCTYPE html>
+<html><head><title>Einrichtungsdatenbank</title></head><body>
+<div class="container">{''.join(cards)}
+<p class="center-block pull-right">Seite {page_number} von {pages}</p>
+</div></body></html>"""
+
+
+def sitemap(origin, organisations):
+    urls = "".join(f"<url><loc>{origin}{DETAIL_PATH}?id={org_id}</loc></url>" for org_id in range(1, organisations + 1))
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url><loc>{origin}{LIST_PATH}</loc></url>'
+            f'{urls}</urlset>')
+
+
+def detail_page(org_id):
+    org = organisation(org_id)
+    website = ""
+    if org["website"]:
+        website = f'<ul class="link-list"><li><a href="{org["website"]}">Website</a></li></ul>'
+    person_email = ""
+    box_email = ""
+    if org["email"] and org["email_in_contact_box"]:
+        box_email = f'<a href="mailto:{org["email"]}">{org["email"]}</a>'
+    elif org["email"]:
+        person_email = f'<a href="mailto:{org["email"]}">{org["email"]}</a>'
+    return f"""<!DOCTYPE html>
+<html><head><title>{html.escape(org["name"])}</title></head><body>
+<div class="container public-search-detail">
+  <div class="headline-wrapper"><h1>{html.escape(org["name"])}</h1>{website}</div>
+  <div class="person-detail"><div class="person-contact">{person_email}</div></div>
+  <div class="locations"><div class="panel panel-primary">
+    <div class="panel-heading"><h3 class="panel-title">{html.escape(org["street"])}<br>{org["postal_code"]} {html.escape(org["city"])}</h3></div>
+    <div class="panel-body"><div class="contact-box">{box_email}</div></div>
+  </div></div>
+</div></body></html>"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    pages = 10
+    cards_per_page = 20
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.error_rate and random.random() < self.error_rate:
+            self.send_error(500)
+            return
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path == LIST_PATH:
+                page_number = int(query.get("Organisations[page]", ["1"])[0])
+                if not 1 <= page_number <= self.pages:
+                    raise ValueError(page_number)
+                body = list_page(page_number, self.pages, self.cards_per_page)
+            elif url.path == DETAIL_PATH:
+                org_id = int(query["id"][0])
+                if not 1 <= org_id <= self.pages * self.cards_per_page:
+                    raise ValueError(org_id)
+                body = detail_page(org_id)
+            elif url.path == SITEMAP_PATH:
+                body = sitemap(f"http://{self.headers['Host']}", self.pages * self.cards_per_page)
+            else:
+                raise ValueError(url.path)
+        except (KeyError, ValueError):
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml" if url.path == SITEMAP_PATH else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server(port=0, pages=10, cards_per_page=20, latency=0.0, jitter=0.0, error_rate=0.0):
+    """Serve the synthetic site from a background thread; returns (server, start_url)."""
+    handler = type("Handler", (FixtureHandler,), {
+        "pages": pages, "cards_per_page": cards_per_page, "latency": latency, "jitter": jitter,
+        "error_rate": error_rate,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{LIST_PATH}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the AWO public search with synthetic data.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--cards-per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra random seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of responses that are HTTP 500")
+    args = parser.parse_args(argv)
+
+    server, start_url = start_server(args.port, args.pages, args.cards_per_page, args.latency, args.jitter,
+                                     args.error_rate)
+    print(f"[INFO] Serving {args.pages} pages x {args.cards_per_page} cards at {start_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+from urllib.parse import urljoin
+import copy
+import re
+import threading
+import time
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+from pacing import Pacer, THROTTLE_STATUSES, parse_retry_after
+from parsing import (
+    CARD_SELECTOR, CARD_TITLE_SELECTOR, CARD_LOCATION_SELECTOR, CARD_TAG_SELECTOR, CARD_LINK_SELECTOR,
+    PAGINATION_SELECTOR, DETAIL_SELECTOR, DETAIL_ADDRESS_SELECTOR, DETAIL_WEBSITE_SELECTOR,
+    DETAIL_EMAIL_SELECTOR, DETAIL_CONTACT_BOX_SELECTOR, CONTACT_BOX_WEBSITE_SELECTOR,
+    CONTACT_BOX_EMAIL_SELECTOR, list_page_url, parse_total_pages, build_card, email_from_href, empty_detail
+)
+
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+# Tags that Chrome renders as their own line, so `.text` in the Selenium
+# path separates them with a newline rather than a space.
+BLOCK_TAGS = {"address", "div", "p", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "table"}
+
+
+def element_text(el):
+    """Approximate Selenium's rendered `.text` for a static lxml element."""
+    el = copy.deepcopy(el)
+    for node in el.iter("script", "style"):
+        node.drop_tree()
+    for node in el.iter():
+        if node is el or not isinstance(node.tag, str):
+            continue
+        if node.tag == "br":
+            node.tail = "\n" + (node.tail or "")
+        elif node.tag in BLOCK_TAGS:
+            node.text = "\n" + (node.text or "")
+            node.tail = "\n" + (node.tail or "")
+    lines = (" ".join(line.split()) for line in el.text_content().split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def resolved_href(el, base_url):
+    href = el.get("href")
+    return urljoin(base_url, href.strip()) if href is not None else None
+
+
+def select(el, selector):
+    with metrics.timer(f"selector:{selector}"):
+        return el.cssselect(selector)
+
+
+def first(el, selector):
+    found = select(el, selector)
+    return found[0] if found else None
+
+
+def extract_cards(doc, base_url):
+    card_els = select(doc, CARD_SELECTOR)
+    if not card_els:
+        # A maintenance or block page can come back as a 200; the Selenium
+        # path times out waiting for the cards, so fail here as well.
+        raise ValueError(f"list page {base_url} has no {CARD_SELECTOR}")
+    cards_data_for_processing = []
+    for card_el in card_els:
+        title_el = first(card_el, CARD_TITLE_SELECTOR)
+        if title_el is None:
+            print("[WARNING] Card without title, skipping.")
+            continue
+        location_el = first(card_el, CARD_LOCATION_SELECTOR)
+        location_text = element_text(location_el).strip() if location_el is not None else None
+        tags = [element_text(tag) for tag in select(card_el, CARD_TAG_SELECTOR)]
+        link_el = first(card_el, CARD_LINK_SELECTOR)
+        details_link = resolved_href(link_el, base_url) if link_el is not None else None
+        cards_data_for_processing.append(build_card(element_text(title_el), location_text, tags, details_link))
+    return cards_data_for_processing
+
+
+def extract_detail(doc, base_url):
+    detail = empty_detail()
+
+    location_title = first(doc, DETAIL_ADDRESS_SELECTOR)
+    if location_title is not None:
+        detail["address"] = element_text(location_title).strip()
+
+    website_el = first(doc, DETAIL_WEBSITE_SELECTOR)
+    if website_el is not None:
+        detail["website"] = resolved_href(website_el, base_url)
+
+    email_el = first(doc, DETAIL_EMAIL_SELECTOR)
+    if email_el is not None:
+        detail["email"] = email_from_href(resolved_href(email_el, base_url))
+
+    if detail["website"] == "-" or detail["email"] == "-":
+        location_contact_box = first(doc, DETAIL_CONTACT_BOX_SELECTOR)
+        if location_contact_box is not None:
+            if detail["website"] == "-":
+                website_el_loc = first(location_contact_box, CONTACT_BOX_WEBSITE_SELECTOR)
+                if website_el_loc is not None:
+                    detail["website"] = resolved_href(website_el_loc, base_url)
+            if detail["email"] == "-":
+                email_el_loc = first(location_contact_box, CONTACT_BOX_EMAIL_SELECTOR)
+                if email_el_loc is not None:
+                    detail["email"] = email_from_href(resolved_href(email_el_loc, base_url))
+
+    return detail
+
+
+META_CHARSET = re.compile(rb"<meta[^>]+charset", re.IGNORECASE)
+
+_parsers = threading.local()
+
+
+def parse_html(body, base_url):
+    # Without a <meta charset> libxml2 falls back to Latin-1, but the site
+    # is UTF-8. lxml parsers must not be shared between threads, hence one
+    # per thread.
+    if isinstance(body, bytes) and not META_CHARSET.search(body[:4096]):
+        parser = getattr(_parsers, "utf8", None)
+        if parser is None:
+            parser = _parsers.utf8 = lxml.html.HTMLParser(encoding="utf-8")
+        return lxml.html.fromstring(body, base_url=base_url, parser=parser)
+    return lxml.html.fromstring(body, base_url=base_url)
+
+
+def parse_list_page(body, base_url):
+    return extract_cards(parse_html(body, base_url), base_url)
+
+
+def parse_detail_page(body, base_url):
+    doc = parse_html(body, base_url)
+    if first(doc, DETAIL_SELECTOR) is None:
+        raise ValueError(f"detail page {base_url} has no {DETAIL_SELECTOR}")
+    return extract_detail(doc, base_url)
+
+
+def parse_pagination(body, base_url):
+    return parse_total_pages(element_text(first(parse_html(body, base_url), PAGINATION_SELECTOR)))
+
+
+class HttpEngine:
+    def __init__(self, start_url, pool_size=10, timeout=20, cache=None, pacer=None, retries=3):
+        self.start_url = start_url
+        self.timeout = timeout
+        self.cache = cache
+        self.pacer = pacer if pacer is not None else Pacer()
+        self.retries = retries
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._list_doc = None
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, url, phase="fetch"):
+        with metrics.timer(phase, url=url) as span:
+            return self._fetch(url, span)
+
+    def _fetch(self, url, span=None):
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None:
+            body, final_url = cached
+        else:
+            response = self.get(url, span)
+            body, final_url = response.content, response.url
+            if self.cache is not None:
+                self.cache.put(url, body, final_url)
+        return parse_html(body, final_url), final_url
+
+    def get(self, url, span=None):
+        """GET through the pacer, backing off and retrying on throttling responses and timeouts.
+
+        Time spent waiting for the pacer is recorded as `pacer_wait` and left
+        out of `span`, so phase timings measure the network alone.
+        """
+        for attempt in range(self.retries + 1):
+            metrics.pacer_wait(self.pacer.acquire(), span)
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if attempt == self.retries:
+                    raise
+                backoff = self.pacer.throttled()
+                print(f"[WARNING] {type(e).__name__} for {url}, backing off {backoff:.1f}s.")
+                continue
+            if response.status_code in THROTTLE_STATUSES and attempt < self.retries:
+                backoff = self.pacer.throttled(parse_retry_after(response.headers.get("Retry-After")))
+                print(f"[WARNING] HTTP {response.status_code} for {url}, backing off {backoff:.1f}s.")
+                continue
+            response.raise_for_status()
+            self.pacer.success(time.monotonic() - started)
+            return response
+
+    def get_total_pages(self):
+        self._list_doc = self.fetch(self.start_url)
+        pagination_info = first(self._list_doc[0], PAGINATION_SELECTOR)
+        if pagination_info is None:
+            raise ValueError(f"list page {self.start_url} has no {PAGINATION_SELECTOR}")
+        return parse_total_pages(element_text(pagination_info))
+
+    def extract_cards(self, page_number):
+        doc = None
+        if page_number == 1:
+            doc, self._list_doc = self._list_doc, None
+        if doc is None:
+            doc = self.fetch(list_page_url(self.start_url, page_number), phase="list_page_load")
+        doc, base_url = doc
+        with metrics.timer("card_extraction", page=page_number):
+            cards_data_for_processing = extract_cards(doc, base_url)
+        print(f"[DEBUG] Found {len(cards_data_for_processing)} cards on page {page_number}.")
+        return cards_data_for_processing
+
+    def fetch_detail(self, card_info):
+        doc, base_url = self.fetch(card_info['details_link'], phase="detail_navigation")
+        with metrics.timer("detail_extraction"):
+            if first(doc, DETAIL_SELECTOR) is None:
+                raise ValueError(f"detail page {base_url} has no {DETAIL_SELECTOR}")
+            return extract_detail(doc, base_url)
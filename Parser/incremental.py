@@ -0,0 +1,132 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+
+from parsing import row_from_record
+
+
+def card_fingerprint(card_info):
+    """Hash of everything the list view shows for an organisation."""
+    parts = [
+        card_info['company_name_list_view'],
+        card_info.get('location_list_view') or "",
+        card_info['tags_str_list_view'],
+    ]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def load_state(path):
+    state = {}
+    if not os.path.exists(path):
+        return state
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            state[entry["link"]] = (entry["fingerprint"], row_from_record(entry["row"]))
+    return state
+
+
+class IncrementalState:
+    """Per-organisation state keyed on `details_link`, carried from run to run.
+
+    Every run writes the fingerprint and row of each organisation it saw to
+    `<path>.new`, which replaces `path` once the run covered every page. With
+    `incremental=True` the previous state is loaded and organisations whose
+    card fingerprint did not change keep their old row instead of having
+    their detail page fetched again. Additions, changes and (at the end of a
+    complete run) removals are appended to `changes_path`. A card whose
+    detail page was dead-lettered keeps its previous entry.
+    """
+
+    def __init__(self, path, changes_path, incremental=False, resume=False):
+        self.path = path
+        self.new_path = path + ".new"
+        self.changes_path = changes_path
+        self.previous = load_state(path) if incremental else {}
+        self.seen = set(load_state(self.new_path)) if resume else set()
+        self.counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        self._lock = threading.Lock()
+
+        if incremental:
+            print(f"[INFO] Incremental mode: {len(self.previous)} organisations known from the previous run.")
+
+        for file_path in (self.new_path, changes_path):
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        write_header = not resume or not os.path.exists(changes_path) or os.path.getsize(changes_path) == 0
+        self._state_file = open(self.new_path, "a" if resume else "w", encoding="utf-8")
+        self._changes_file = open(changes_path, "a" if resume else "w", newline="", encoding="utf-8")
+        self._changes = csv.writer(self._changes_file)
+        if write_header:
+            self._changes.writerow(["change", "details_link", "A (Company Name)"])
+
+    def known(self, details_link):
+        """Whether the previous run (in incremental mode) had an entry for `details_link`."""
+        return details_link in self.previous
+
+    def previous_row(self, card_info):
+        """Row from the previous run if the card is unchanged, else None."""
+        details_link = card_info['details_link']
+        if not details_link or details_link not in self.previous:
+            return None
+        fingerprint, row = self.previous[details_link]
+        return row if fingerprint == card_fingerprint(card_info) else None
+
+    def record(self, results):
+        with self._lock:
+            for card_info, row, carried_over in results:
+                details_link = card_info['details_link']
+                if not details_link or details_link in self.seen:
+                    continue
+                if row is None:
+                    # The card was listed but its detail page was dead-lettered:
+                    # not a removal, so keep what the previous run knew.
+                    if details_link in self.previous:
+                        self.seen.add(details_link)
+                        fingerprint, previous_row = self.previous[details_link]
+                        entry = {"link": details_link, "fingerprint": fingerprint, "row": list(previous_row)}
+                        self._state_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    continue
+                self.seen.add(details_link)
+                if carried_over:
+                    change = "unchanged"
+                elif details_link in self.previous:
+                    change = "changed"
+                else:
+                    change = "added"
+                self.counts[change] += 1
+                if change != "unchanged" and self.previous:
+                    self._changes.writerow([change, details_link, row.company_name])
+                entry = {"link": details_link, "fingerprint": card_fingerprint(card_info), "row": list(row)}
+                self._state_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._state_file.flush()
+            self._changes_file.flush()
+
+    def finish(self, complete):
+        """Report removals and promote the new state if the run saw every page."""
+        if complete:
+            for details_link, (fingerprint, row) in self.previous.items():
+                if details_link not in self.seen:
+                    self.counts["removed"] += 1
+                    self._changes.writerow(["removed", details_link, row.company_name])
+        self.close()
+        if complete:
+            os.replace(self.new_path, self.path)
+        else:
+            print("[WARNING] Run did not cover every page; keeping previous state and not reporting removals.")
+        print(f"[INFO] Organisations added: {self.counts['added']}, changed: {self.counts['changed']}, "
+              f"unchanged: {self.counts['unchanged']}, removed: {self.counts['removed']}")
+
+    def close(self):
+        if not self._state_file.closed:
+            self._state_file.close()
+            self._changes_file.close()
@@ -1,243 +1,491 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
-import csv
-import re
-from urllib.parse import urlparse
-import time
-
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")
-options.add_argument("--disable-gpu")
-options.add_argument("--no-sandbox")
-
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
-wait = WebDriverWait(driver, 20)
-data = []
-
-postal_regex = re.compile(r'(\d{5})\s+(.+)$')
-email_regex = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
-
-def parse_address(address_str):
-    match = postal_regex.search(address_str)
-    return match.groups() if match else ("", "")
-
-def clean_domain(url):
-    if not url or not isinstance(url, str) or not url.startswith("http"):
-        return "-"
-    parsed_url = urlparse(url)
-    domain = parsed_url.netloc
-    if domain.startswith("www."):
-        domain = domain[4:]
-    return domain
-
-def get_total_pages(start_url):
-    driver.get(start_url)
-    try:
-        pagination_info = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "p.center-block.pull-right")))
-        total_pages_text = pagination_info.text
-        return int(total_pages_text.split()[-1])
-    except Exception as e:
-        print(f"[CRITICAL] Could not determine total pages. Starting with page 1. Error: {e}")
-        return 1
-
-def parse_page():
-    org_cards_elements = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".panel.panel-primary")))
-    print(f"[DEBUG] Found {len(org_cards_elements)} cards on this page.")
-
-    cards_data_for_processing = []
-    for i, card_el in enumerate(org_cards_elements):
-        company_name_list_view = "-"
-        postal_code_list_view = "-"
-        city_list_view = "-"
-        tags_str_list_view = "-"
-        details_link = None
-
-        try:
-            title_text = card_el.find_element(By.CSS_SELECTOR, ".panel-heading h3.panel-title").text
-            try:
-                location_data_span = card_el.find_element(By.CSS_SELECTOR, ".add-loc-data").text.strip()
-                postal_code_list_view, city_list_view = parse_address(location_data_span)
-                company_name_list_view = title_text.replace(location_data_span, "").strip()
-            except NoSuchElementException:
-                company_name_list_view = title_text
-
-            tags = [tag.text for tag in card_el.find_elements(By.CSS_SELECTOR, ".badge.badge-pill.badge-primary")]
-            tags_str_list_view = "; ".join(tags)
-
-            try:
-                details_link_el = card_el.find_element(By.CSS_SELECTOR, ".detail-link a")
-                details_link = details_link_el.get_attribute("href")
-            except NoSuchElementException:
-                pass
-
-            cards_data_for_processing.append({
-                'company_name_list_view': company_name_list_view,
-                'postal_code_list_view': postal_code_list_view,
-                'city_list_view': city_list_view,
-                'tags_str_list_view': tags_str_list_view,
-                'details_link': details_link
-            })
-        except StaleElementReferenceException:
-            print(f"[WARNING] Stale element during initial card data extraction. Retrying page.")
-            return False
-
-    for card_info in cards_data_for_processing:
-        email = "-"
-        email_domain = "-"
-        website = "-"
-        website_domain = "-"
-        address_detail_page = "-"
-
-        company_name = card_info['company_name_list_view']
-        postal_code = card_info['postal_code_list_view']
-        city = card_info['city_list_view']
-        tags_str = card_info['tags_str_list_view']
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import queue
+import threading
+
+from checkpoint import Checkpoint
+from dedup import Deduplicator
+from discovery import Discovery, detail_urls_from_sitemap
+from distributed import WorkQueue, default_worker_id, run_coordinator, run_worker
+from failures import DeadLetter, RetryPolicy, load_dead_letters
+from incremental import IncrementalState
+from metrics import metrics
+from pacing import Pacer
+from page_cache import PageCache
+from parsing import build_row, empty_detail
+from writers import FORMATS, create_writer
+
+START_URL = "https://einrichtungsdatenbank.awo.org/organisations/public-search"
+
+
+class PageSink:
+    """Where finished pages go: rows to the writer and the run state, then the page to the checkpoint."""
+
+    def __init__(self, writer, checkpoint, state, dedup=None, skip_seen_details=False, dead_letter=None):
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.state = state
+        self.dead_letter = dead_letter
+        self.dedup = dedup
+        self.skip_seen_details = skip_seen_details
+        # Pages whose rows the writer still buffers (Parquet batches); they
+        # only reach the checkpoint once the writer reports them on disk.
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def skip_page(self, page_number):
+        return self.checkpoint.page_done(page_number)
+
+    def skip_card(self, card_info):
         details_link = card_info['details_link']
-
+        if self.skip_seen_details and self.dedup.seen_link(details_link):
+            return True
+        return bool(details_link) and self.checkpoint.detail_done(details_link)
+
+    def skip_prefetch(self, details_link):
+        """Whether a detail URL known before its card (from the sitemap) should wait for the card.
+
+        That is the case if it was saved already, or if the previous run
+        knew it, since its row may be reused once the card's fingerprint is
+        known.
+        """
+        return self.checkpoint.detail_done(details_link) or self.state.known(details_link)
+
+    def previous_row(self, card_info):
+        return self.state.previous_row(card_info)
+
+    def page_done(self, page_number, results):
+        with self._lock:
+            if self.dedup is not None:
+                results = [(card_info, row, carried_over) for card_info, row, carried_over in results
+                           if row is None or self.dedup.add(row, card_info['details_link'])]
+            rows = [row for card_info, row, carried_over in results if row is not None]
+            with metrics.timer("output_write", page=page_number, rows=len(rows)):
+                durable = self.writer.write_rows(rows)
+            self._pending.append((page_number, [card_info['details_link'] for card_info, row, carried_over in results
+                                                if card_info['details_link'] and row is not None]))
+            if durable:
+                self._mark_pending()
+        metrics.incr("pages")
+        metrics.incr("rows", len(rows))
+        metrics.incr("rows_carried_over", sum(1 for card_info, row, carried_over in results if carried_over))
+        metrics.incr("cards_failed", sum(1 for card_info, row, carried_over in results if row is None))
+        self.state.record(results)
+
+    def card_failed(self, page_number, card_info, reason, attempts):
+        metrics.incr("dead_letters")
+        if self.dead_letter is not None:
+            self.dead_letter.record("detail", page_number, reason, attempts, card_info=card_info)
+
+    def page_failed(self, page_number, reason, attempts):
+        metrics.incr("dead_letters")
+        if self.dead_letter is not None:
+            self.dead_letter.record("page", page_number, reason, attempts)
+
+    def _mark_pending(self):
+        for page_number, details_links in self._pending:
+            self.checkpoint.mark_page(page_number, details_links, self.writer.offset)
+        self._pending = []
+
+    def close(self, complete, domains_path=None, retry_finished=True):
+        with self._lock:
+            self.writer.close()
+            self._mark_pending()
+        self.checkpoint.close()
+        if self.dead_letter is not None:
+            self.dead_letter.close(finished=retry_finished)
+            if self.dead_letter.count:
+                print(f"[WARNING] {self.dead_letter.count} failed tasks recorded in {self.dead_letter.path}; "
+                      f"rerun them with --retry-failed.")
+        if self.dedup is not None:
+            print(f"[INFO] Dropped {self.dedup.duplicates} duplicate organisations.")
+            if domains_path:
+                print(f"[INFO] Wrote {self.dedup.write_domains(domains_path)} domains to {domains_path}.")
+        self.state.finish(complete)
+
+
+def create_engine(args, cache, pacer):
+    if args.engine == "http":
+        from http_engine import HttpEngine
+        return HttpEngine(args.start_url, pool_size=args.pool_size + args.detail_workers, timeout=args.page_timeout,
+                          cache=cache, pacer=pacer, retries=args.fetch_retries)
+    from selenium_engine import SeleniumEngine
+    return SeleniumEngine(args.start_url, page_timeout=args.page_timeout, pacer=pacer, retries=args.fetch_retries,
+                          js_extract=args.js_extract, chromedriver_path=args.chromedriver, lean=args.lean_browser,
+                          recycle_pages=args.recycle_pages, recycle_rss_mb=args.recycle_rss_mb)
+
+def count_pages(engine, policy):
+    """engine.get_total_pages() retried within `policy`; None once the attempts are used up."""
+    attempts = 0
+    while True:
+        attempts += 1
         try:
-            print(f"[DEBUG] Processing organization: {company_name} (Link: {details_link if details_link else 'N/A'})")
-
-            if details_link and details_link.startswith("http"):
-                driver.get(details_link)
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".container.public-search-detail")))
-                try:
-                    location_titles = driver.find_elements(By.CSS_SELECTOR, ".locations .panel-primary .panel-heading .panel-title")
-                    if location_titles:
-                        address_detail_page = location_titles[0].text.strip()
-                        print(f"[DEBUG] Found address using new selector for {company_name}: {address_detail_page}")
-                    else:
-                        print(f"[DEBUG] No address found in .locations .panel-title for {company_name}.")
-                except Exception as e:
-                    print(f"[ERROR] Error extracting address using new selector for {company_name}: {e}")
-                    address_detail_page = "-"
-
-                try:
-                    website_el = driver.find_element(By.CSS_SELECTOR, ".headline-wrapper .link-list a[href*='http']")
-                    website = website_el.get_attribute("href")
-                    website_domain = clean_domain(website)
-                    print(f"[DEBUG] Found website in headline-wrapper for {company_name}: {website}")
-                except NoSuchElementException:
-                    print(f"[DEBUG] No website found in headline-wrapper for {company_name}.")
-                except Exception as e:
-                    print(f"[ERROR] Error extracting website from headline-wrapper for {company_name}: {e}")
-
-                try:
-                    email_el = driver.find_element(By.CSS_SELECTOR, ".person-detail .person-contact a[href^='mailto:']")
-                    email = email_el.get_attribute("href").replace("mailto:", "").strip()
-                    email_domain = email.split("@")[-1]
-                    print(f"[DEBUG] Found email in person-detail for {company_name}: {email}")
-                except NoSuchElementException:
-                    print(f"[DEBUG] No email found in person-detail for {company_name}.")
-                except Exception as e:
-                    print(f"[ERROR] Error extracting email from person-detail for {company_name}: {e}")
-
-                if website == "-" or email == "-":
-                    try:
-                        location_contact_box = driver.find_element(By.CSS_SELECTOR, ".locations .panel-primary .panel-body .contact-box")
-                        if website == "-":
-                            try:
-                                website_el_loc = location_contact_box.find_element(By.CSS_SELECTOR, "a[href^='http']")
-                                website = website_el_loc.get_attribute("href")
-                                website_domain = clean_domain(website)
-                                print(f"[DEBUG] Found website in location contact box for {company_name}: {website}")
-                            except NoSuchElementException:
-                                pass
-                            except Exception as e:
-                                print(f"[ERROR] Error extracting website from location contact box for {company_name}: {e}")
-                        if email == "-":
-                            try:
-                                email_el_loc = location_contact_box.find_element(By.CSS_SELECTOR, "a[href^='mailto:']")
-                                email = email_el_loc.get_attribute("href").replace("mailto:", "").strip()
-                                email_domain = email.split("@")[-1]
-                                print(f"[DEBUG] Found email in location contact box for {company_name}: {email}")
-                            except NoSuchElementException:
-                                pass
-                            except Exception as e:
-                                print(f"[ERROR] Error extracting email from location contact box for {company_name}: {e}")
-                    except NoSuchElementException:
-                        print(f"[DEBUG] No location-specific contact box found for {company_name}.")
-                    except Exception as e:
-                        print(f"[ERROR] Error accessing location contact box for {company_name}: {e}")
-
-                driver.back()
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".panel.panel-primary")))
-                time.sleep(1)
-            else:
-                print(f"[DEBUG] Not visiting detail page for {company_name}. No valid link.")
-
-            if address_detail_page != "-":
-                temp_postal, temp_city = parse_address(address_detail_page)
-                if temp_postal and temp_city:
-                    postal_code = temp_postal
-                    city = temp_city
-
-            data.append({
-                "A (Company Name)": company_name,
-                "B (Company Domain)": website_domain,
-                "C (Email)": email,
-                "D (Email Domain)": email_domain,
-                "E (Street Address)": address_detail_page,
-                "F (Postal Code)": postal_code,
-                "G (City)": city,
-                "J (Tags)": tags_str
-            })
-
-        except StaleElementReferenceException:
-            print(f"[ERROR] Stale element encountered for {company_name if company_name else 'an unknown card'} during processing. This card will be skipped on this iteration.")
-            continue
+            with metrics.timer("get_total_pages"):
+                return engine.get_total_pages()
+        except Exception as e:
+            if not policy.should_retry(attempts):
+                print(f"[CRITICAL] Could not determine total pages after {attempts} attempts: {type(e).__name__}: {e}")
+                return None
+            print(f"[WARNING] Could not determine total pages (attempt {attempts}), retrying: {e}")
+            policy.backoff(attempts)
+
+def process_card(engine, sink, card_info, page_number, policy):
+    """Row for one card, retrying its detail page within `policy`.
+
+    A card that runs out of attempts goes to the sink's dead-letter file
+    and comes back as None.
+    """
+    company_name = card_info['company_name_list_view']
+    details_link = card_info['details_link']
+    previous_row = sink.previous_row(card_info)
+    if previous_row is not None:
+        print(f"[DEBUG] Unchanged since last run, reusing row: {company_name}")
+        return previous_row, True
+    if not details_link or not details_link.startswith("http"):
+        print(f"[DEBUG] Not visiting detail page for {company_name}. No valid link.")
+        return build_row(card_info, empty_detail()), False
+
+    print(f"[DEBUG] Processing organization: {company_name} (Link: {details_link})")
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            with metrics.timer("detail_total", url=details_link):
+                detail = engine.fetch_detail(card_info)
+            return build_row(card_info, detail), False
         except Exception as e:
-            print(f"[ERROR] General error processing card {company_name if company_name else 'Unknown Card'}: {e}")
+            reason = f"{type(e).__name__}: {e}"
+            if not policy.should_retry(attempts):
+                print(f"[ERROR] Giving up on {company_name or 'Unknown Card'} after {attempts} attempts: {reason}")
+                sink.card_failed(page_number, card_info, reason, attempts)
+                return None, False
+            print(f"[WARNING] Error processing card {company_name or 'Unknown Card'} (attempt {attempts}), retrying: {e}")
+            metrics.incr("detail_retries")
+            policy.backoff(attempts)
+
+def process_cards(engine, executor, sink, page_number, cards, policy):
+    """Run the cards' details on `executor` and hand the page to the sink."""
+    # map() yields results in card order no matter which worker finishes first.
+    rows = executor.map(lambda card_info: process_card(engine, sink, card_info, page_number, policy), cards)
+    sink.page_done(page_number, [(card_info, row, carried_over)
+                                 for card_info, (row, carried_over) in zip(cards, rows)])
+
+def parse_page(engine, executor, sink, page_number, policy):
+    cards_data_for_processing = engine.extract_cards(page_number)
+    if cards_data_for_processing is None:
+        raise RuntimeError(f"page {page_number} went stale while reading its cards")
+
+    skipped = [card_info for card_info in cards_data_for_processing if sink.skip_card(card_info)]
+    if skipped:
+        print(f"[INFO] Skipping {len(skipped)} organisations on page {page_number} already saved by a previous run.")
+        cards_data_for_processing = [card_info for card_info in cards_data_for_processing if not sink.skip_card(card_info)]
+
+    process_cards(engine, executor, sink, page_number, cards_data_for_processing, policy)
+
+def run_page_workers(engine, executor, sink, page_numbers, total_pages, pool_size, policy):
+    """Shard the list pages over `pool_size` workers.
+
+    Each worker thread drives its own browser (or shares the pooled HTTP
+    session). A page whose cards can't be read is retried within `policy`
+    after a backoff, by whichever worker is free, and dead-lettered once
+    its attempts are used up; card failures are retried per card and never
+    restart the page. Finished pages are handed to `sink` as they complete,
+    so with more than one worker the output is in completion order.
+    """
+    pages = queue.Queue()
+    for page_number in page_numbers:
+        if sink.skip_page(page_number):
             continue
+        pages.put(page_number)
+    print(f"[INFO] {pages.qsize()} pages left to scrape.")
+    attempts = {}
+    given_up = []
 
-    return True
-
-start_url = "https://einrichtungsdatenbank.awo.org/organisations/public-search"
-
-try:
-    total_pages = get_total_pages(start_url)
-    print(f"[INFO] Total pages to scrape: {total_pages}")
-
-    current_page = 1
-    while current_page <= total_pages:
-        print(f"\n[INFO] --- Parsing page {current_page}/{total_pages} ---")
-
-        if current_page > 1:
-            url = f"{start_url}?Organisations%5Bpage%5D={current_page}"
-            driver.get(url)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".panel.panel-primary")))
-            time.sleep(1)
-
-        page_parsed_successfully = False
-        try:
-            page_parsed_successfully = parse_page()
-        except StaleElementReferenceException:
-            print(f"[CRITICAL] Entire page {current_page} became stale at start of processing. Retrying this page.")
-            page_parsed_successfully = False
+    def worker():
+        while True:
+            try:
+                page_number = pages.get_nowait()
+            except queue.Empty:
+                return
+            print(f"\n[INFO] --- Parsing page {page_number}/{total_pages} ---")
+            try:
+                parse_page(engine, executor, sink, page_number, policy)
+            except Exception as e:
+                attempts[page_number] = attempts.get(page_number, 0) + 1
+                reason = f"{type(e).__name__}: {e}"
+                if not policy.should_retry(attempts[page_number]):
+                    print(f"[ERROR] Giving up on page {page_number} after {attempts[page_number]} attempts: {reason}")
+                    sink.page_failed(page_number, reason, attempts[page_number])
+                    given_up.append(page_number)
+                    continue
+                print(f"[WARNING] Page {page_number} failed (attempt {attempts[page_number]}), retrying: {e}")
+                metrics.incr("page_retries")
+                policy.backoff(attempts[page_number])
+                pages.put(page_number)
+
+    if pool_size <= 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker, name=f"page-worker-{i}") for i in range(pool_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return given_up
+
+def retry_failed(engine, executor, sink, entries, pool_size, policy):
+    """Re-run the tasks of a dead-letter file: cards straight from their stored card, pages from scratch."""
+    cards_by_page = {}
+    page_numbers = []
+    for entry in entries:
+        if entry["kind"] == "page":
+            page_numbers.append(entry["page"])
+        elif not sink.skip_card(entry["card"]):
+            cards_by_page.setdefault(entry["page"], []).append(entry["card"])
+    print(f"[INFO] Retrying {sum(len(cards) for cards in cards_by_page.values())} failed organisations "
+          f"and {len(page_numbers)} failed pages.")
+
+    for page_number, cards in sorted(cards_by_page.items()):
+        process_cards(engine, executor, sink, page_number, cards, policy)
+    return run_page_workers(engine, executor, sink, sorted(set(page_numbers)), max(page_numbers, default=0),
+                            pool_size, policy)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape the AWO public organisation database into a CSV file.")
+    parser.add_argument("--engine", choices=["selenium", "http", "async"], default="selenium",
+                        help="selenium drives headless Chrome; http fetches server-rendered HTML and parses it with lxml; "
+                             "async runs the http engine's parsing in an asyncio fetch/parse/write pipeline")
+    parser.add_argument("--js-extract", action="store_true",
+                        help="selenium engine: read each page's fields with one execute_script call instead of per-element lookups")
+    parser.add_argument("--chromedriver", default=None, metavar="PATH",
+                        help="pinned chromedriver binary (default: $CHROMEDRIVER_PATH, else resolved by webdriver-manager)")
+    parser.add_argument("--lean-browser", action="store_true",
+                        help="selenium engine: eager page loads, no images/CSS/fonts, extensions or background networking")
+    parser.add_argument("--recycle-pages", type=int, default=None,
+                        help="selenium engine: restart each browser after this many page loads")
+    parser.add_argument("--recycle-rss-mb", type=float, default=None,
+                        help="selenium engine: restart a browser whose process tree exceeds this resident memory")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="keep peak memory flat: recycle browsers (default every 100 page loads or 700 MB), "
+                             "one page worker and at most 2 detail workers, i.e. at most 3 Chrome instances")
+    parser.add_argument("--start-url", default=START_URL)
+    parser.add_argument("--max-pages", type=int, default=None, help="stop after this many list pages")
+    parser.add_argument("--detail-workers", type=int, default=4,
+                        help="number of detail pages fetched concurrently (one browser each with --engine selenium)")
+    parser.add_argument("--pool-size", type=int, default=1,
+                        help="number of list pages scraped in parallel (one browser each with --engine selenium)")
+    parser.add_argument("--max-rps", type=float, default=5,
+                        help="politeness ceiling: requests per second across all workers")
+    parser.add_argument("--min-rps", type=float, default=0.2, help="lowest rate the pacer backs off to")
+    parser.add_argument("--page-timeout", type=float, default=20,
+                        help="seconds to wait for a page to load and its content to appear")
+    parser.add_argument("--fetch-retries", type=int, default=3,
+                        help="retries with backoff after a timeout or throttling response")
+    parser.add_argument("--cache", default=None, metavar="PATH",
+                        help="SQLite page cache for the http engine (e.g. output/page_cache.sqlite)")
+    parser.add_argument("--cache-ttl", type=float, default=24, help="hours before a cached page is fetched again")
+    parser.add_argument("--cache-max-mb", type=float, default=512,
+                        help="compressed cache size cap; least recently used pages are evicted")
+    parser.add_argument("--offline", action="store_true",
+                        help="replay pages from --cache only, never touching the live site (implies --engine http or async)")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="tries per list page and per detail page before it is dead-lettered")
+    parser.add_argument("--retry-delay", type=float, default=1.0,
+                        help="backoff after a task's first failure, doubled after each further one (capped at 60s)")
+    parser.add_argument("--dead-letter", default="output/awo_failed.jsonl",
+                        help="JSONL of pages and detail URLs that failed every attempt, with the reason")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="only re-run the tasks in --dead-letter, appending to --output; tasks that fail again stay in it")
+    parser.add_argument("--discovery", choices=["sitemap", "list"], default=None,
+                        help="start detail pages without walking the list pages in order: sitemap queues every detail URL "
+                             "from the sitemap at once, list fetches all list pages in parallel; "
+                             "list-view fields are joined back by URL")
+    parser.add_argument("--sitemap", default=None, metavar="URL",
+                        help="sitemap for --discovery sitemap (default: /sitemap.xml on the start URL's host)")
+    parser.add_argument("--queue", default=None, metavar="PATH",
+                        help="shared SQLite work queue for a multi-node crawl (on a volume every node mounts); needs --role")
+    parser.add_argument("--role", choices=["coordinator", "worker"], default=None,
+                        help="coordinator queues the pages and merges the rows into --output; "
+                             "workers take page and detail tasks from --queue")
+    parser.add_argument("--worker-id", default=None, help="name of this worker in the queue (default: host-pid)")
+    parser.add_argument("--lease-seconds", type=float, default=120,
+                        help="a task not finished within this time is handed to another worker")
+    parser.add_argument("--metrics", default=None, metavar="PATH",
+                        help="write one JSON line per timed phase (page loads, selector lookups, CSV writes, ...)")
+    parser.add_argument("--output", default="output/awo_data.csv")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="output format (default: from the --output suffix, else csv); parquet writes a directory of part files")
+    parser.add_argument("--checkpoint", default="output/awo_checkpoint.jsonl",
+                        help="records finished pages and detail URLs for --resume")
+    parser.add_argument("--resume", action="store_true",
+                        help="append to --output and skip pages and organisations recorded in --checkpoint")
+    parser.add_argument("--dedup", action="store_true",
+                        help="drop organisations already written in this run (same detail URL, or same name and address)")
+    parser.add_argument("--skip-seen-details", action="store_true",
+                        help="don't fetch detail pages for URLs already seen in this run (implies --dedup)")
+    parser.add_argument("--domains", default=None, metavar="PATH",
+                        help="write a domain -> organisations table at the end of the run (implies --dedup)")
+    parser.add_argument("--state", default="output/awo_state.jsonl",
+                        help="per-organisation fingerprints and rows, replaced after every complete run")
+    parser.add_argument("--changes", default="output/awo_changes.csv",
+                        help="added/changed/removed organisations compared with the previous --state")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fetch detail pages of organisations that are new or whose card changed since --state")
+    args = parser.parse_args(argv)
+    if args.skip_seen_details or args.domains:
+        args.dedup = True
+    if args.low_memory:
+        if args.recycle_pages is None:
+            args.recycle_pages = 100
+        if args.recycle_rss_mb is None:
+            args.recycle_rss_mb = 700
+        args.detail_workers = min(args.detail_workers, 2)
+        args.pool_size = 1
+    if args.retry_failed:
+        if args.role:
+            parser.error("--retry-failed runs on a single node")
+        args.resume = True
+        if args.engine == "async":
+            args.engine = "http"
+    if args.discovery:
+        if args.role or args.retry_failed or args.engine == "async":
+            parser.error("--discovery runs on a single node with --engine http or selenium")
+        if args.discovery == "sitemap" and args.engine != "http":
+            parser.error("--discovery sitemap needs --engine http")
+        if args.engine == "http":
+            # List pages are cheap requests here, so fetch them as wide as the detail pool.
+            args.pool_size = max(args.pool_size, args.detail_workers)
+    if bool(args.queue) != bool(args.role):
+        parser.error("--queue and --role go together")
+    if args.role and args.engine == "async":
+        parser.error("--role needs --engine selenium or http")
+    if args.role and (args.incremental or args.skip_seen_details):
+        # Workers fetch the detail page of every card they are handed.
+        parser.error("--incremental and --skip-seen-details run on a single node")
+    if args.offline:
+        if not args.cache:
+            parser.error("--offline needs --cache")
+        if args.engine == "selenium":
+            args.engine = "http"
+    return args
+
+def work(args):
+    """Run as a queue worker: no output of its own, rows go back through the queue."""
+    cache = None
+    if args.cache and args.engine == "http":
+        cache = PageCache(args.cache, ttl=args.cache_ttl * 3600, max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                          offline=args.offline)
+    engine = create_engine(args, cache, Pacer(max_rate=args.max_rps, min_rate=args.min_rps))
+    try:
+        policy = RetryPolicy(max_attempts=args.max_attempts, base_delay=args.retry_delay)
+        run_worker(engine, WorkQueue(args.queue, lease_seconds=args.lease_seconds, policy=policy),
+                   threads=max(1, args.detail_workers), worker_id=args.worker_id or default_worker_id())
+    finally:
+        engine.close()
+        if cache is not None:
+            cache.close()
+        print(metrics.summary())
+        metrics.close()
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.configure(args.metrics)
+    if args.role == "worker":
+        work(args)
+        return
+    checkpoint = Checkpoint(args.checkpoint, resume=args.resume)
+    sink = PageSink(
+        create_writer(args.output, args.format, append=args.resume, truncate_to=checkpoint.offset),
+        checkpoint,
+        IncrementalState(args.state, args.changes, incremental=args.incremental, resume=args.resume),
+        dedup=Deduplicator() if args.dedup else None,
+        skip_seen_details=args.skip_seen_details,
+        dead_letter=DeadLetter(args.dead_letter, append=args.resume and not args.retry_failed,
+                               replace=args.retry_failed),
+    )
+    cache = None
+    if args.cache:
+        cache = PageCache(args.cache, ttl=args.cache_ttl * 3600, max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                          offline=args.offline)
+        if args.engine == "selenium":
+            print("[WARNING] --cache only applies to --engine http and async; ignoring it.")
+    pacer = Pacer(max_rate=args.max_rps, min_rate=args.min_rps)
+    policy = RetryPolicy(max_attempts=args.max_attempts, base_delay=args.retry_delay)
+    engine = None
+    executor = None
+
+    complete = False
+    retry_finished = False
 
-        if page_parsed_successfully:
-            current_page += 1
+    try:
+        if args.role == "coordinator":
+            # Before anything slow, so workers already polling a reused
+            # queue don't see last run's tasks as a finished crawl.
+            work_queue = WorkQueue(args.queue, lease_seconds=args.lease_seconds, policy=policy)
+            work_queue.reset(fresh=not args.resume)
+
+        if args.engine == "async":
+            from async_pipeline import run_async_pipeline
+            complete = run_async_pipeline(args.start_url, sink, max_pages=args.max_pages, cache=cache, pacer=pacer,
+                                          detail_workers=args.detail_workers, list_workers=args.pool_size,
+                                          timeout=args.page_timeout, retries=args.fetch_retries, policy=policy)
+            return
+
+        engine = create_engine(args, cache, pacer)
+        executor = ThreadPoolExecutor(max_workers=max(1, args.detail_workers))
+        if args.retry_failed:
+            # Only part of the site is visited, so the run never counts as complete.
+            retry_failed(engine, executor, sink, load_dead_letters(args.dead_letter), args.pool_size, policy)
+            retry_finished = True
+            return
+
+        total_pages = count_pages(engine, policy)
+        if total_pages is None:
+            # Page 1 alone is still worth saving, but the run can't count as
+            # complete: removals would be reported for every other page.
+            total_pages, limited = 1, True
+            print("[WARNING] Scraping page 1 only; the run will not count as complete.")
         else:
-            print(f"[INFO] Retrying page {current_page} due to error.")
-
-except Exception as e:
-    print(f"[CRITICAL] An unhandled error occurred during scraping: {str(e)}")
-
-finally:
-    driver.quit()
-    print("\n[INFO] WebDriver closed. Writing data to CSV.")
-    with open("output/awo_data.csv", "w", newline="", encoding="utf-8") as f:
-        fieldnames = [
-            "A (Company Name)", "B (Company Domain)", "C (Email)", "D (Email Domain)",
-            "E (Street Address)", "F (Postal Code)", "G (City)", "J (Tags)"
-        ]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
-
-    print(f"[INFO] Scraping complete. {len(data)} records saved to awo_data.csv")
+            print(f"[INFO] Total pages to scrape: {total_pages}")
+            limited = args.max_pages is not None and args.max_pages < total_pages
+            if limited:
+                total_pages = args.max_pages
+                print(f"[INFO] Limiting parsing to the first {total_pages} pages.")
+
+        if args.role == "coordinator":
+            given_up = run_coordinator(work_queue, sink, total_pages)
+            work_queue.close()
+        elif args.discovery:
+            detail_urls = []
+            if args.discovery == "sitemap" and limited:
+                print("[WARNING] Only part of the list pages is scraped; not queueing the whole sitemap.")
+            elif args.discovery == "sitemap":
+                detail_urls = detail_urls_from_sitemap(engine, args.start_url, args.sitemap)
+            given_up = Discovery(engine, sink, policy, detail_workers=args.detail_workers,
+                                 list_workers=args.pool_size).run(total_pages, detail_urls)
+        else:
+            given_up = run_page_workers(engine, executor, sink, range(1, total_pages + 1), total_pages,
+                                        args.pool_size, policy)
+        complete = not given_up and not limited
+
+    except Exception as e:
+        print(f"[CRITICAL] An unhandled error occurred during scraping: {str(e)}")
+
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if engine is not None:
+            engine.close()
+        sink.close(complete, domains_path=args.domains, retry_finished=retry_finished or not args.retry_failed)
+        if cache is not None:
+            stats = cache.stats()
+            print(f"[INFO] Page cache: {stats['hits']} hits, {stats['misses']} misses, {stats['pages']} pages stored.")
+            cache.close()
+        print(f"\n[INFO] {args.engine} engine closed.")
+        print(f"[INFO] Scraping complete. {sink.writer.rows_written} records saved to {args.output} in this run.")
+        print(metrics.summary())
+        metrics.close()
+
+if __name__ == "__main__":
+    main()
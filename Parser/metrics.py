@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+import json
+import os
+import random
+import threading
+import time
+
+# Samples kept per phase for percentiles; beyond this a uniform reservoir
+# sample is kept so memory stays flat on full-database runs.
+RESERVOIR_SIZE = 10000
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < RESERVOIR_SIZE:
+                self.samples[slot] = value
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Span:
+    """Handle yielded by `Metrics.timer`; time passed to `exclude` is left out of the phase."""
+
+    def __init__(self):
+        self.excluded = 0.0
+
+    def exclude(self, seconds):
+        self.excluded += seconds
+
+
+class Metrics:
+    """Counters and per-phase timing histograms for one run, shared by all threads."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.monotonic()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def configure(self, path=None):
+        self.started = time.monotonic()
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8")
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, phase, seconds, **fields):
+        with self._lock:
+            self.histograms.setdefault(phase, Histogram()).add(seconds)
+            if self._file is not None:
+                event = {"ts": round(time.time(), 3), "phase": phase, "seconds": round(seconds, 6)}
+                event.update(fields)
+                self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def timer(self, phase, **fields):
+        started = time.monotonic()
+        span = Span()
+        ok = True
+        try:
+            yield span
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.observe(phase, time.monotonic() - started - span.excluded, ok=ok, **fields)
+
+    def pacer_wait(self, seconds, span=None):
+        """Record time spent waiting for a pacer token as its own phase, and keep it out of `span`."""
+        self.observe("pacer_wait", seconds)
+        if span is not None:
+            span.exclude(seconds)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            lines = [f"[INFO] Run report after {elapsed:.1f}s:"]
+            pages = self.counters.get("pages", 0)
+            lines.append(f"[INFO]   pages/minute: {pages / elapsed * 60 if elapsed else 0:.1f}")
+            for name in sorted(self.counters):
+                lines.append(f"[INFO]   {name}: {self.counters[name]}")
+            lines.append(f"[INFO]   {'phase':<60} {'count':>7} {'total s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for phase in sorted(self.histograms, key=lambda p: -self.histograms[p].total):
+                h = self.histograms[phase]
+                lines.append(f"[INFO]   {phase:<60} {h.count:>7} {h.total:>9.2f} {h.percentile(50) * 1000:>9.1f} "
+                             f"{h.percentile(95) * 1000:>9.1f} {h.percentile(99) * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+metrics = Metrics()
@@ -0,0 +1,106 @@
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+from parsing import FIELDNAMES, TAG_SEPARATOR, email_regex, postal_regex
+
+# Column names used inside the frames; FIELDNAMES are only used on disk.
+COLUMNS = dict(zip(FIELDNAMES, [
+    "company_name", "company_domain", "email", "email_domain",
+    "street_address", "postal_code", "city", "tags"
+]))
+
+ADDRESS_PATTERN = r"^(?P<street>.*?)[\s,]*" + postal_regex.pattern
+
+
+def missing(series):
+    return series.isna() | series.isin(["", "-"])
+
+
+def normalise_frame(df):
+    """Clean a frame of rows column by column with vectorised string operations.
+
+    * the detail-page address is split into street, postal code and city;
+      postal code and city only replace the list-view values when the
+      address contains both
+    * emails are trimmed, lowercased and checked against `email_regex`;
+      anything else becomes "-" and the email domain is derived from what is left
+    * website domains are lowercased, trailing dots and `www.` stripped
+    * tags are trimmed, de-duplicated and sorted
+    """
+    import pandas as pd
+
+    df = df.copy()
+
+    address = df["street_address"].str.replace(r"\s+", " ", regex=True).str.strip()
+    parts = address.str.extract(ADDRESS_PATTERN)
+    has_parts = parts[1].notna()
+    df["street_address"] = parts["street"].str.strip(" ,").where(has_parts, address)
+    df["postal_code"] = parts[1].where(has_parts, df["postal_code"])
+    df["city"] = parts[2].str.strip().where(has_parts, df["city"])
+
+    email = df["email"].str.strip().str.lower()
+    valid = email.str.fullmatch(email_regex.pattern, na=False)
+    df["email"] = email.where(valid, "-")
+    df["email_domain"] = email.str.split("@").str[-1].where(valid, "-")
+
+    domain = df["company_domain"].str.strip().str.lower().str.rstrip(".")
+    domain = domain.str.replace(r"^www\.", "", regex=True)
+    df["company_domain"] = domain.mask(missing(domain), "-")
+
+    # Only a few hundred distinct tag combinations exist, so canonicalise
+    # those and map the result back through the factorised codes.
+    codes, combinations = pd.factorize(df["tags"].fillna(""))
+    tags = pd.Series(combinations).str.split(TAG_SEPARATOR.strip())
+    tags = tags.explode().str.strip().str.replace(r"\s+", " ", regex=True)
+    tags = tags[tags.fillna("") != ""]
+    tags = tags.groupby(level=0).agg(lambda group: TAG_SEPARATOR.join(sorted(set(group))))
+    df["tags"] = tags.reindex(range(len(combinations)), fill_value="").to_numpy()[codes]
+
+    for column in ("street_address", "postal_code", "city"):
+        df[column] = df[column].mask(missing(df[column]), "-")
+    return df
+
+
+def normalise_csv(input_path, output_path, chunksize=100000):
+    """Rewrite a CSV written by main.py with normalised columns, `chunksize` rows at a time."""
+    import pandas as pd
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    total = 0
+    chunks = pd.read_csv(input_path, dtype=str, keep_default_na=False, chunksize=chunksize)
+    for index, chunk in enumerate(chunks):
+        chunk = normalise_frame(chunk.rename(columns=COLUMNS))
+        chunk.rename(columns={v: k for k, v in COLUMNS.items()}).to_csv(
+            output_path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        total += len(chunk)
+    if total == 0:
+        pd.DataFrame(columns=FIELDNAMES).to_csv(output_path, index=False)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-apply the clean-up rules to a scraped CSV without scraping again.")
+    parser.add_argument("input", help="CSV written by main.py")
+    parser.add_argument("--output", help="normalised CSV (default: <input>.normalised.csv)")
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per batch")
+    args = parser.parse_args(argv)
+
+    if importlib.util.find_spec("pandas") is None:
+        print("[ERROR] normalise.py needs pandas: pip install pandas")
+        return 1
+
+    stem = args.input[:-4] if args.input.endswith(".csv") else args.input
+    output = args.output or stem + ".normalised.csv"
+    started = time.monotonic()
+    total = normalise_csv(args.input, output, chunksize=args.chunksize)
+    print(f"[INFO] Normalised {total} rows in {time.monotonic() - started:.1f}s -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import threading
+import time
+
+# Responses that mean "slow down" rather than "this page is broken".
+THROTTLE_STATUSES = {429, 502, 503, 504}
+
+
+class Pacer:
+    """Adaptive token bucket shared by every thread of a run.
+
+    The request rate starts at `max_rate` (the politeness ceiling) and is
+    never exceeded. Throttling responses and timeouts halve the rate and
+    block all requests for an exponentially growing backoff (or the server's
+    Retry-After). Successful requests raise the rate again step by step, and
+    latencies well above the best observed latency ease it down before the
+    server starts refusing requests.
+    """
+
+    def __init__(self, max_rate=5.0, min_rate=0.2, burst=None, max_backoff=120.0):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max_rate
+        self.burst = burst if burst is not None else max(1.0, max_rate)
+        self.max_backoff = max_backoff
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_errors = 0
+        self.latency = None
+        self.best_latency = None
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(delay, self.blocked_until - now)
+
+    def acquire(self):
+        """Wait for a token; returns the seconds waited."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+    def success(self, latency):
+        with self._lock:
+            self.consecutive_errors = 0
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.best_latency is None or self.latency < self.best_latency:
+                self.best_latency = self.latency
+            if self.latency > 3 * self.best_latency:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            else:
+                self.rate = min(self.max_rate, self.rate + 0.1 * self.max_rate)
+
+    def throttled(self, retry_after=None):
+        """Record a throttling response or timeout and return the backoff applied."""
+        with self._lock:
+            self.consecutive_errors += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            backoff = min(self.max_backoff, 2 ** (self.consecutive_errors - 1))
+            if retry_after is not None:
+                backoff = min(self.max_backoff, max(backoff, retry_after))
+            self.blocked_until = max(self.blocked_until, time.monotonic() + backoff)
+            return backoff
+
+
+def parse_retry_after(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
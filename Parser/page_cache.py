@@ -0,0 +1,132 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class PageCache:
+    """URL-keyed page store in a single SQLite file.
+
+    Bodies are zlib-compressed. Entries older than `ttl` seconds are treated
+    as missing (except in offline mode, which replays whatever is stored),
+    and once the compressed total exceeds `max_bytes` the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, path, ttl=24 * 3600, max_bytes=512 * 1024 * 1024, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                final_url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._db.commit()
+        # Running compressed total, so a put doesn't have to sum the table.
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url):
+        """Return (body, final_url) for a fresh entry, or None."""
+        with self._lock:
+            entry = self._db.execute("SELECT final_url, body, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+            if entry is None or (not self.offline and time.time() - entry[2] > self.ttl):
+                self.misses += 1
+                if self.offline:
+                    raise CacheMiss(f"{url} is not in the page cache")
+                return None
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+            self.hits += 1
+        return zlib.decompress(entry[1]), entry[0]
+
+    def put(self, url, body, final_url):
+        if self.offline:
+            return
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self._lock:
+            replaced = self._db.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, final_url, body, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, final_url, compressed, len(compressed), now, now),
+            )
+            self._total += len(compressed) - (replaced[0] if replaced is not None else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self, batch=64):
+        while self._total > self.max_bytes:
+            oldest = self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at LIMIT ?", (batch,)).fetchall()
+            if not oldest:
+                break
+            for url, size in oldest:
+                self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    break
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"pages": count, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def export(self, directory):
+        """Write every cached page to `directory` as an HTML file, e.g. for a regression corpus."""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            entries = self._db.execute("SELECT url, body FROM pages ORDER BY url").fetchall()
+        with open(os.path.join(directory, "index.tsv"), "w", encoding="utf-8") as index:
+            for url, body in entries:
+                name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+                with open(os.path.join(directory, name), "wb") as f:
+                    f.write(zlib.decompress(body))
+                index.write(f"{name}\t{url}\n")
+        return len(entries)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or export the scraper's page cache.")
+    parser.add_argument("cache", help="path to the SQLite cache file")
+    parser.add_argument("--export", metavar="DIR", help="write every cached page to DIR as HTML")
+    args = parser.parse_args(argv)
+
+    cache = PageCache(args.cache, offline=True)
+    try:
+        stats = cache.stats()
+        print(f"[INFO] {stats['pages']} pages, {stats['bytes'] / 1024 / 1024:.1f} MB compressed")
+        if args.export:
+            print(f"[INFO] Exported {cache.export(args.export)} pages to {args.export}")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
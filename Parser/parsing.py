@@ -0,0 +1,119 @@
+from collections import namedtuple
+import re
+from urllib.parse import urlparse
+
+CARD_SELECTOR = ".panel.panel-primary"
+CARD_TITLE_SELECTOR = ".panel-heading h3.panel-title"
+CARD_LOCATION_SELECTOR = ".add-loc-data"
+CARD_TAG_SELECTOR = ".badge.badge-pill.badge-primary"
+CARD_LINK_SELECTOR = ".detail-link a"
+PAGINATION_SELECTOR = "p.center-block.pull-right"
+
+DETAIL_SELECTOR = ".container.public-search-detail"
+DETAIL_ADDRESS_SELECTOR = ".locations .panel-primary .panel-heading .panel-title"
+DETAIL_WEBSITE_SELECTOR = ".headline-wrapper .link-list a[href*='http']"
+DETAIL_EMAIL_SELECTOR = ".person-detail .person-contact a[href^='mailto:']"
+DETAIL_CONTACT_BOX_SELECTOR = ".locations .panel-primary .panel-body .contact-box"
+CONTACT_BOX_WEBSITE_SELECTOR = "a[href^='http']"
+CONTACT_BOX_EMAIL_SELECTOR = "a[href^='mailto:']"
+
+FIELDNAMES = [
+    "A (Company Name)", "B (Company Domain)", "C (Email)", "D (Email Domain)",
+    "E (Street Address)", "F (Postal Code)", "G (City)", "J (Tags)"
+]
+
+# One output row. A namedtuple has no per-row dict or repeated column-name
+# keys, which keeps the rows held by incremental state and in-flight pages small.
+# `tags` is a tuple; flat formats such as CSV join it with TAG_SEPARATOR.
+Row = namedtuple("Row", [
+    "company_name", "company_domain", "email", "email_domain",
+    "street_address", "postal_code", "city", "tags"
+])
+
+TAG_SEPARATOR = "; "
+
+def split_tags(tags_str):
+    return tuple(tag for tag in tags_str.split(TAG_SEPARATOR) if tag)
+
+def row_from_record(record):
+    """Row from a stored list or a legacy FIELDNAMES-keyed dict."""
+    if isinstance(record, dict):
+        record = [record[name] for name in FIELDNAMES]
+    row = Row(*record)
+    tags = split_tags(row.tags) if isinstance(row.tags, str) else tuple(row.tags)
+    return row._replace(tags=tags)
+
+def flat_row(row):
+    """Row values as written to a CSV line, with the tags joined."""
+    return row._replace(tags=TAG_SEPARATOR.join(row.tags))
+
+postal_regex = re.compile(r'(\d{5})\s+(.+)$')
+email_regex = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+
+def list_page_url(start_url, page_number):
+    if page_number <= 1:
+        return start_url
+    return f"{start_url}?Organisations%5Bpage%5D={page_number}"
+
+def parse_address(address_str):
+    match = postal_regex.search(address_str)
+    return match.groups() if match else ("", "")
+
+def clean_domain(url):
+    if not url or not isinstance(url, str) or not url.startswith("http"):
+        return "-"
+    parsed_url = urlparse(url)
+    domain = parsed_url.netloc
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain
+
+def parse_total_pages(pagination_text):
+    return int(pagination_text.split()[-1])
+
+def build_card(title_text, location_text, tags, details_link):
+    postal_code = "-"
+    city = "-"
+    if location_text is None:
+        company_name = title_text
+    else:
+        postal_code, city = parse_address(location_text)
+        company_name = title_text.replace(location_text, "").strip()
+    return {
+        'company_name_list_view': company_name,
+        'postal_code_list_view': postal_code,
+        'city_list_view': city,
+        'tags_str_list_view': TAG_SEPARATOR.join(tags),
+        'tags_list_view': tuple(tags),
+        'location_list_view': location_text,
+        'details_link': details_link
+    }
+
+def email_from_href(href):
+    return href.replace("mailto:", "").strip()
+
+def empty_detail():
+    return {"address": "-", "website": "-", "email": "-"}
+
+def build_row(card_info, detail):
+    postal_code = card_info['postal_code_list_view']
+    city = card_info['city_list_view']
+    address_detail_page = detail["address"]
+    email = detail["email"]
+
+    if address_detail_page != "-":
+        temp_postal, temp_city = parse_address(address_detail_page)
+        if temp_postal and temp_city:
+            postal_code = temp_postal
+            city = temp_city
+
+    return Row(
+        company_name=card_info['company_name_list_view'],
+        company_domain=clean_domain(detail["website"]),
+        email=email,
+        email_domain=email.split("@")[-1] if email != "-" else "-",
+        street_address=address_detail_page,
+        postal_code=postal_code,
+        city=city,
+        tags=card_info['tags_list_view']
+    )
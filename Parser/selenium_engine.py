@@ -0,0 +1,369 @@
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from webdriver_manager.chrome import ChromeDriverManager
+import os
+import threading
+import time
+
+from metrics import metrics
+from pacing import Pacer
+from parsing import (
+    CARD_SELECTOR, CARD_TITLE_SELECTOR, CARD_LOCATION_SELECTOR, CARD_TAG_SELECTOR, CARD_LINK_SELECTOR,
+    PAGINATION_SELECTOR, DETAIL_SELECTOR, DETAIL_ADDRESS_SELECTOR, DETAIL_WEBSITE_SELECTOR,
+    DETAIL_EMAIL_SELECTOR, DETAIL_CONTACT_BOX_SELECTOR, CONTACT_BOX_WEBSITE_SELECTOR,
+    CONTACT_BOX_EMAIL_SELECTOR, list_page_url, parse_total_pages, build_card, email_from_href, empty_detail
+)
+
+
+def find_element(scope, selector):
+    with metrics.timer(f"selector:{selector}"):
+        return scope.find_element(By.CSS_SELECTOR, selector)
+
+
+def find_elements(scope, selector):
+    with metrics.timer(f"selector:{selector}"):
+        return scope.find_elements(By.CSS_SELECTOR, selector)
+
+# Resources the scraper never reads; blocked in lean mode via CDP so Chrome
+# does not download or decode them.
+BLOCKED_URL_PATTERNS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+]
+
+# How many page loads pass between browser memory checks.
+RSS_CHECK_INTERVAL = 5
+
+LEAN_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--blink-settings=imagesEnabled=false",
+]
+
+
+# Mirrors WebElement.text closely enough for the cards: rendered text with
+# whitespace collapsed inside each line and blank lines dropped.
+TEXT_JS = """
+const text = el => (el.innerText || "").split("\\n")
+    .map(line => line.replace(/\\s+/g, " ").trim()).filter(Boolean).join("\\n");
+"""
+
+CARDS_SCRIPT = TEXT_JS + """
+const [cardSelector, titleSelector, locationSelector, tagSelector, linkSelector] = arguments;
+return Array.from(document.querySelectorAll(cardSelector), card => {
+    const title = card.querySelector(titleSelector);
+    const location = card.querySelector(locationSelector);
+    const link = card.querySelector(linkSelector);
+    return {
+        title: title ? text(title) : null,
+        location: location ? text(location) : null,
+        tags: Array.from(card.querySelectorAll(tagSelector), text),
+        link: link ? link.href : null,
+    };
+});
+"""
+
+DETAIL_SCRIPT = TEXT_JS + """
+const [addressSelector, websiteSelector, emailSelector, boxSelector, boxWebsiteSelector, boxEmailSelector] = arguments;
+const address = document.querySelector(addressSelector);
+const website = document.querySelector(websiteSelector);
+const email = document.querySelector(emailSelector);
+const box = document.querySelector(boxSelector);
+const boxWebsite = box && box.querySelector(boxWebsiteSelector);
+const boxEmail = box && box.querySelector(boxEmailSelector);
+return {
+    address: address ? text(address) : null,
+    website: website ? website.href : null,
+    email: email ? email.href : null,
+    box_website: boxWebsite ? boxWebsite.href : null,
+    box_email: boxEmail ? boxEmail.href : null,
+};
+"""
+
+
+class SeleniumEngine:
+    """Headless Chrome engine.
+
+    Every thread that touches the engine gets its own Chrome instance, so the
+    list page stays loaded in the main thread's browser while detail pages are
+    visited by the worker threads' browsers.
+    """
+
+    def __init__(self, start_url, page_timeout=20, pacer=None, retries=3, js_extract=False,
+                 chromedriver_path=None, lean=False, recycle_pages=None, recycle_rss_mb=None):
+        self.start_url = start_url
+        self.recycle_pages = recycle_pages
+        self.recycle_rss_mb = recycle_rss_mb
+        self.js_extract = js_extract
+        self.lean = lean
+        self.page_timeout = page_timeout
+        self.pacer = pacer if pacer is not None else Pacer()
+        self.retries = retries
+        self.options = webdriver.ChromeOptions()
+        self.options.add_argument("--headless")
+        self.options.add_argument("--disable-gpu")
+        self.options.add_argument("--no-sandbox")
+        if lean:
+            for argument in LEAN_ARGUMENTS:
+                self.options.add_argument(argument)
+            self.options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.stylesheets": 2,
+                "profile.managed_default_content_settings.fonts": 2,
+            })
+            # Return from driver.get() at DOMContentLoaded; navigate() waits for
+            # the element it needs anyway.
+            self.options.page_load_strategy = "eager"
+
+        chromedriver_path = chromedriver_path or os.environ.get("CHROMEDRIVER_PATH")
+        if chromedriver_path:
+            self.service_path = chromedriver_path
+        else:
+            with metrics.timer("chromedriver_install"):
+                self.service_path = ChromeDriverManager().install()
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    @property
+    def driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            with metrics.timer("browser_start"):
+                driver = webdriver.Chrome(service=Service(self.service_path), options=self.options)
+            driver.set_page_load_timeout(self.page_timeout)
+            if self.lean:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+            self._local.driver = driver
+            self._local.navigations = 0
+            self._local.wait = WebDriverWait(driver, self.page_timeout)
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    @property
+    def wait(self):
+        self.driver
+        return self._local.wait
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"[WARNING] Could not quit WebDriver cleanly: {e}")
+
+    def browser_rss_mb(self):
+        """Resident memory of this thread's chromedriver and every Chrome process under it."""
+        import psutil
+        root = psutil.Process(self.driver.service.process.pid)
+        total = 0
+        for process in [root] + root.children(recursive=True):
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / 1024 / 1024
+
+    def recycle(self, reason):
+        """Quit this thread's browser; the next access starts a fresh one."""
+        driver = self._local.driver
+        self._local.driver = None
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        print(f"[INFO] Recycling browser after {self._local.navigations} page loads ({reason}).")
+        metrics.incr("browser_recycles")
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"[WARNING] Could not quit WebDriver cleanly: {e}")
+
+    def _maybe_recycle(self):
+        if getattr(self._local, "driver", None) is None:
+            return
+        navigations = self._local.navigations
+        if self.recycle_pages and navigations >= self.recycle_pages:
+            self.recycle(f"limit of {self.recycle_pages}")
+        elif self.recycle_rss_mb and navigations and navigations % RSS_CHECK_INTERVAL == 0:
+            rss_mb = self.browser_rss_mb()
+            if rss_mb > self.recycle_rss_mb:
+                self.recycle(f"{rss_mb:.0f} MB RSS over {self.recycle_rss_mb:.0f} MB")
+
+    def navigate(self, url, ready_selector, phase="navigation"):
+        """Load `url` and wait until `ready_selector` is present, pacing and backing off on timeouts."""
+        self._maybe_recycle()
+        self._local.navigations = getattr(self._local, "navigations", 0) + 1
+        for attempt in range(self.retries + 1):
+            metrics.pacer_wait(self.pacer.acquire())
+            started = time.monotonic()
+            try:
+                with metrics.timer(phase, url=url):
+                    self.driver.get(url)
+                    element = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+            except TimeoutException:
+                if attempt == self.retries:
+                    raise
+                backoff = self.pacer.throttled()
+                print(f"[WARNING] Timed out waiting for {ready_selector} on {url}, backing off {backoff:.1f}s.")
+                continue
+            self.pacer.success(time.monotonic() - started)
+            return element
+
+    def get_total_pages(self):
+        pagination_info = self.navigate(self.start_url, PAGINATION_SELECTOR)
+        return parse_total_pages(pagination_info.text)
+
+    def extract_cards(self, page_number):
+        url = list_page_url(self.start_url, page_number)
+        if self.driver.current_url != url:
+            self.navigate(url, CARD_SELECTOR, phase="list_page_load")
+        if self.js_extract:
+            with metrics.timer("card_extraction", page=page_number):
+                cards_data_for_processing = self._extract_cards_script()
+            print(f"[DEBUG] Found {len(cards_data_for_processing)} cards on page {page_number}.")
+            return cards_data_for_processing
+        try:
+            org_cards_elements = self.wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+        except StaleElementReferenceException:
+            print(f"[CRITICAL] Entire page {page_number} became stale at start of processing.")
+            return None
+        print(f"[DEBUG] Found {len(org_cards_elements)} cards on page {page_number}.")
+
+        with metrics.timer("card_extraction", page=page_number):
+            return self._extract_cards(org_cards_elements)
+
+    def _extract_cards(self, org_cards_elements):
+        cards_data_for_processing = []
+        for card_el in org_cards_elements:
+            try:
+                title_text = find_element(card_el, CARD_TITLE_SELECTOR).text
+                try:
+                    location_text = find_element(card_el, CARD_LOCATION_SELECTOR).text.strip()
+                except NoSuchElementException:
+                    location_text = None
+
+                tags = [tag.text for tag in find_elements(card_el, CARD_TAG_SELECTOR)]
+
+                details_link = None
+                try:
+                    details_link = find_element(card_el, CARD_LINK_SELECTOR).get_attribute("href")
+                except NoSuchElementException:
+                    pass
+
+                cards_data_for_processing.append(build_card(title_text, location_text, tags, details_link))
+            except StaleElementReferenceException:
+                print(f"[WARNING] Stale element during initial card data extraction. Retrying page.")
+                return None
+
+        return cards_data_for_processing
+
+    def _extract_cards_script(self):
+        """All card fields of the loaded list page in a single execute_script round trip."""
+        with metrics.timer("selector:script:cards"):
+            raw_cards = self.driver.execute_script(CARDS_SCRIPT, CARD_SELECTOR, CARD_TITLE_SELECTOR,
+                                                   CARD_LOCATION_SELECTOR, CARD_TAG_SELECTOR, CARD_LINK_SELECTOR)
+        cards_data_for_processing = []
+        for raw in raw_cards:
+            if raw["title"] is None:
+                print("[WARNING] Card without title, skipping.")
+                continue
+            cards_data_for_processing.append(build_card(raw["title"], raw["location"], raw["tags"], raw["link"]))
+        return cards_data_for_processing
+
+    def fetch_detail(self, card_info):
+        company_name = card_info['company_name_list_view']
+        detail = empty_detail()
+
+        self.navigate(card_info['details_link'], DETAIL_SELECTOR, phase="detail_navigation")
+        driver = self.driver
+        with metrics.timer("detail_extraction"):
+            if self.js_extract:
+                self._extract_detail_script(driver, company_name, detail)
+            else:
+                self._extract_detail(driver, company_name, detail)
+        return detail
+
+    def _extract_detail_script(self, driver, company_name, detail):
+        """Contact, website and address fields of the loaded detail page in one execute_script round trip."""
+        with metrics.timer("selector:script:detail"):
+            raw = driver.execute_script(DETAIL_SCRIPT, DETAIL_ADDRESS_SELECTOR, DETAIL_WEBSITE_SELECTOR,
+                                        DETAIL_EMAIL_SELECTOR, DETAIL_CONTACT_BOX_SELECTOR,
+                                        CONTACT_BOX_WEBSITE_SELECTOR, CONTACT_BOX_EMAIL_SELECTOR)
+        if raw["address"] is not None:
+            detail["address"] = raw["address"].strip()
+        website = raw["website"] or raw["box_website"]
+        if website:
+            detail["website"] = website
+        email = raw["email"] or raw["box_email"]
+        if email:
+            detail["email"] = email_from_href(email)
+        print(f"[DEBUG] Extracted {company_name}: address={detail['address']!r} website={detail['website']!r} email={detail['email']!r}")
+
+    def _extract_detail(self, driver, company_name, detail):
+        try:
+            location_titles = find_elements(driver, DETAIL_ADDRESS_SELECTOR)
+            if location_titles:
+                detail["address"] = location_titles[0].text.strip()
+                print(f"[DEBUG] Found address using new selector for {company_name}: {detail['address']}")
+            else:
+                print(f"[DEBUG] No address found in .locations .panel-title for {company_name}.")
+        except Exception as e:
+            print(f"[ERROR] Error extracting address using new selector for {company_name}: {e}")
+            detail["address"] = "-"
+
+        try:
+            detail["website"] = find_element(driver, DETAIL_WEBSITE_SELECTOR).get_attribute("href")
+            print(f"[DEBUG] Found website in headline-wrapper for {company_name}: {detail['website']}")
+        except NoSuchElementException:
+            print(f"[DEBUG] No website found in headline-wrapper for {company_name}.")
+        except Exception as e:
+            print(f"[ERROR] Error extracting website from headline-wrapper for {company_name}: {e}")
+
+        try:
+            detail["email"] = email_from_href(find_element(driver, DETAIL_EMAIL_SELECTOR).get_attribute("href"))
+            print(f"[DEBUG] Found email in person-detail for {company_name}: {detail['email']}")
+        except NoSuchElementException:
+            print(f"[DEBUG] No email found in person-detail for {company_name}.")
+        except Exception as e:
+            print(f"[ERROR] Error extracting email from person-detail for {company_name}: {e}")
+
+        if detail["website"] == "-" or detail["email"] == "-":
+            try:
+                location_contact_box = find_element(driver, DETAIL_CONTACT_BOX_SELECTOR)
+                if detail["website"] == "-":
+                    try:
+                        detail["website"] = find_element(location_contact_box, CONTACT_BOX_WEBSITE_SELECTOR).get_attribute("href")
+                        print(f"[DEBUG] Found website in location contact box for {company_name}: {detail['website']}")
+                    except NoSuchElementException:
+                        pass
+                    except Exception as e:
+                        print(f"[ERROR] Error extracting website from location contact box for {company_name}: {e}")
+                if detail["email"] == "-":
+                    try:
+                        detail["email"] = email_from_href(find_element(location_contact_box, CONTACT_BOX_EMAIL_SELECTOR).get_attribute("href"))
+                        print(f"[DEBUG] Found email in location contact box for {company_name}: {detail['email']}")
+                    except NoSuchElementException:
+                        pass
+                    except Exception as e:
+                        print(f"[ERROR] Error extracting email from location contact box for {company_name}: {e}")
+            except NoSuchElementException:
+                print(f"[DEBUG] No location-specific contact box found for {company_name}.")
+            except Exception as e:
+                print(f"[ERROR] Error accessing location contact box for {company_name}: {e}")
+
@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASE_URL = "https://einrichtungsdatenbank.awo.org"
+LIST_PATH = "/organisations/public-search"
+DETAIL_PATH = "/organisations/public-search/view"
+# Saved detail page for each detail id linked from list_page.html.
+DETAIL_FIXTURES = {"101": "detail_contact_box.html", "102": "detail_person.html"}
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def fixture_site():
+    """Serve the saved pages at their site paths; yields the start URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == LIST_PATH:
+                name = "list_page.html"
+            elif url.path == DETAIL_PATH:
+                name = DETAIL_FIXTURES.get(parse_qs(url.query).get("id", [""])[0])
+            else:
+                name = None
+            if name is None:
+                self.send_error(404)
+                return
+            body = read_fixture(name)
+            self.send_response(200)
+            # Like the site: the charset is only ever in the markup, if at all.
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}{LIST_PATH}"
+    server.shutdown()
@@ -0,0 +1,49 @@
+import time
+
+from distributed import WorkQueue
+from failures import RetryPolicy
+
+CARD = {'company_name_list_view': "AWO Ortsverein", 'postal_code_list_view': "-", 'city_list_view': "-",
+        'tags_str_list_view': "", 'tags_list_view': [], 'location_list_view': None, 'details_link': None}
+
+
+def detail_tasks(work_queue):
+    return work_queue.db.execute("SELECT page FROM tasks WHERE kind = 'detail'").fetchall()
+
+
+def test_expired_lease_only_lets_the_new_holder_finish(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.05)
+    work_queue.reset()
+    work_queue.seed([1])
+    task_a = work_queue.claim("a")
+    time.sleep(0.1)
+    task_b = work_queue.claim("b")
+    assert task_b[0] == task_a[0]
+
+    work_queue.expand(task_a[0], "a", 1, [CARD])
+    assert detail_tasks(work_queue) == []
+    assert work_queue.fail(task_a[0], "a", "RuntimeError: stale") is None
+    work_queue.expand(task_b[0], "b", 1, [CARD])
+    assert detail_tasks(work_queue) == [(1,)]
+    assert work_queue.counts()["page:done"] == 1
+
+
+def test_stale_worker_cannot_touch_the_next_crawl(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    work_queue = WorkQueue(path, policy=RetryPolicy(max_attempts=1))
+    work_queue.reset()
+    work_queue.seed([1])
+    task_a = work_queue.claim("a")
+
+    # The coordinator restarts fresh while worker A still holds page 1.
+    coordinator = WorkQueue(path)
+    coordinator.reset(fresh=True)
+    coordinator.seed([5])
+    task_b = work_queue.claim("b")
+    assert task_b[2] == 5 and task_b[0] != task_a[0]
+
+    work_queue.expand(task_a[0], "a", 1, [CARD])
+    assert work_queue.fail(task_a[0], "a", "RuntimeError: stale") is None
+    assert detail_tasks(work_queue) == []
+    assert coordinator.mergeable_pages() == []
+    assert coordinator.counts() == {"page:leased": 1}
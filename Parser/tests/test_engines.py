@@ -0,0 +1,137 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import BASE_URL, DETAIL_PATH, LIST_PATH, read_fixture
+from http_engine import HttpEngine, parse_detail_page, parse_list_page, parse_pagination
+from parsing import Row, build_row, empty_detail
+
+LIST_URL = BASE_URL + LIST_PATH
+
+EXPECTED_CARDS = [
+    {
+        'company_name_list_view': "AWO Kindertagesstätte Sonnenschein",
+        'postal_code_list_view': "48143",
+        'city_list_view': "Münster",
+        'tags_str_list_view': "Kindertagesstätte; Familienbildung",
+        'tags_list_view': ("Kindertagesstätte", "Familienbildung"),
+        'location_list_view': "48143 Münster",
+        'details_link': BASE_URL + DETAIL_PATH + "?id=101",
+    },
+    {
+        'company_name_list_view': "AWO Seniorenzentrum Am Weiher",
+        'postal_code_list_view': "-",
+        'city_list_view': "-",
+        'tags_str_list_view': "Pflege",
+        'tags_list_view': ("Pflege",),
+        'location_list_view': None,
+        'details_link': BASE_URL + DETAIL_PATH + "?id=102",
+    },
+    {
+        'company_name_list_view': "AWO Ortsverein Köln-Süd",
+        'postal_code_list_view': "50677",
+        'city_list_view': "Köln",
+        'tags_str_list_view': "",
+        'tags_list_view': (),
+        'location_list_view': "50677 Köln",
+        'details_link': None,
+    },
+]
+
+EXPECTED_DETAILS = {
+    "detail_contact_box.html": {
+        "address": "Grüner Weg 12\n48143 Münster",
+        "website": "https://www.awo-muenster.de/kita-sonnenschein",
+        "email": "kita.sonnenschein@awo-muenster.de",
+    },
+    "detail_person.html": {
+        "address": "Weiherstraße 3\n90403 Nürnberg",
+        "website": "https://seniorenzentrum.awo-weiher.de",
+        "email": "leitung@awo-weiher.de",
+    },
+}
+
+EXPECTED_ROWS = [
+    Row("AWO Kindertagesstätte Sonnenschein", "awo-muenster.de", "kita.sonnenschein@awo-muenster.de",
+        "awo-muenster.de", "Grüner Weg 12\n48143 Münster", "48143", "Münster",
+        ("Kindertagesstätte", "Familienbildung")),
+    Row("AWO Seniorenzentrum Am Weiher", "seniorenzentrum.awo-weiher.de", "leitung@awo-weiher.de",
+        "awo-weiher.de", "Weiherstraße 3\n90403 Nürnberg", "90403", "Nürnberg", ("Pflege",)),
+    Row("AWO Ortsverein Köln-Süd", "-", "-", "-", "-", "50677", "Köln", ()),
+]
+
+
+def expected_cards(base_url):
+    return [dict(card, details_link=card['details_link'] and card['details_link'].replace(BASE_URL, base_url))
+            for card in EXPECTED_CARDS]
+
+
+def test_list_page_cards():
+    assert parse_list_page(read_fixture("list_page.html"), LIST_URL) == EXPECTED_CARDS
+
+
+def test_pagination():
+    assert parse_pagination(read_fixture("list_page.html"), LIST_URL) == 7
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_DETAILS))
+def test_detail_page(name):
+    assert parse_detail_page(read_fixture(name), BASE_URL + DETAIL_PATH) == EXPECTED_DETAILS[name]
+
+
+def test_detail_page_without_detail_container():
+    with pytest.raises(ValueError):
+        parse_detail_page(read_fixture("list_page.html"), LIST_URL)
+
+
+def test_list_page_without_cards():
+    # A maintenance page served as 200 must fail the page, not finish it empty.
+    with pytest.raises(ValueError):
+        parse_list_page("<h1>Wartungsarbeiten</h1>".encode("utf-8"), LIST_URL)
+
+
+def test_umlauts_without_meta_charset():
+    # list_page.html declares no charset; it must not be read as Latin-1.
+    assert b"charset" not in read_fixture("list_page.html")
+    assert parse_list_page(read_fixture("list_page.html"), LIST_URL)[0]['city_list_view'] == "Münster"
+
+
+def test_rows():
+    details = [parse_detail_page(read_fixture(name), BASE_URL + DETAIL_PATH)
+               for name in ("detail_contact_box.html", "detail_person.html")] + [empty_detail()]
+    assert [build_row(card, detail) for card, detail in zip(EXPECTED_CARDS, details)] == EXPECTED_ROWS
+
+
+def engine_rows(engine):
+    assert engine.get_total_pages() == 7
+    cards = engine.extract_cards(1)
+    details = [engine.fetch_detail(card) if card['details_link'] else empty_detail() for card in cards]
+    return cards, [build_row(card, detail) for card, detail in zip(cards, details)]
+
+
+def test_http_engine(fixture_site):
+    engine = HttpEngine(fixture_site)
+    try:
+        cards, rows = engine_rows(engine)
+    finally:
+        engine.close()
+    assert cards == expected_cards(fixture_site.replace(LIST_PATH, ""))
+    assert rows == EXPECTED_ROWS
+
+
+CHROMEDRIVER = os.environ.get("CHROMEDRIVER_PATH") or shutil.which("chromedriver")
+
+
+@pytest.mark.skipif(CHROMEDRIVER is None, reason="needs Chrome and chromedriver (set CHROMEDRIVER_PATH)")
+@pytest.mark.parametrize("js_extract", [False, True], ids=["elements", "script"])
+def test_selenium_engine_matches(fixture_site, js_extract):
+    from selenium_engine import SeleniumEngine
+
+    engine = SeleniumEngine(fixture_site, js_extract=js_extract, chromedriver_path=CHROMEDRIVER)
+    try:
+        cards, rows = engine_rows(engine)
+    finally:
+        engine.close()
+    assert cards == expected_cards(fixture_site.replace(LIST_PATH, ""))
+    assert rows == EXPECTED_ROWS
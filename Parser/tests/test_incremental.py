@@ -0,0 +1,35 @@
+import json
+
+from incremental import IncrementalState, card_fingerprint
+from parsing import Row, row_from_record
+
+
+def card(number, tags="Pflege"):
+    return {'company_name_list_view': f"AWO Einrichtung {number}", 'location_list_view': "48143 Münster",
+            'tags_str_list_view': tags, 'details_link': f"https://einrichtungsdatenbank.awo.org/view?id={number}"}
+
+
+def row(number):
+    return Row(f"AWO Einrichtung {number}", "-", "-", "-", "-", "48143", "Münster", ("Pflege",))
+
+
+def test_dead_lettered_card_is_not_reported_removed(tmp_path):
+    state_path, changes_path = str(tmp_path / "state.jsonl"), str(tmp_path / "changes.csv")
+    with open(state_path, "w", encoding="utf-8") as f:
+        for number in (1, 2):
+            entry = {"link": card(number)['details_link'], "fingerprint": card_fingerprint(card(number)),
+                     "row": list(row(number))}
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    state = IncrementalState(state_path, changes_path, incremental=True)
+    # Card 2 changed, and its detail page then failed on every attempt.
+    state.record([(card(1), row(1), True), (card(2, tags="Pflege; Beratung"), None, False)])
+    state.finish(complete=True)
+
+    assert state.counts["removed"] == 0
+    with open(state_path, encoding="utf-8") as f:
+        entries = {entry["link"]: entry for entry in map(json.loads, f)}
+    assert sorted(entries) == [card(1)['details_link'], card(2)['details_link']]
+    # The old fingerprint is kept, so the next incremental run fetches card 2 again.
+    assert entries[card(2)['details_link']]["fingerprint"] == card_fingerprint(card(2))
+    assert row_from_record(entries[card(2)['details_link']]["row"]) == row(2)
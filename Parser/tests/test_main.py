@@ -0,0 +1,26 @@
+from failures import RetryPolicy
+from main import count_pages
+
+
+class FlakyEngine:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def get_total_pages(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("HTTP 500")
+        return 7
+
+
+def test_count_pages_retries_within_the_policy():
+    engine = FlakyEngine(failures=1)
+    assert count_pages(engine, RetryPolicy(max_attempts=2, base_delay=0)) == 7
+    assert engine.calls == 2
+
+
+def test_count_pages_gives_up_instead_of_assuming_one_page():
+    engine = FlakyEngine(failures=3)
+    assert count_pages(engine, RetryPolicy(max_attempts=3, base_delay=0)) is None
+    assert engine.calls == 3
@@ -0,0 +1,21 @@
+import os
+
+from page_cache import PageCache
+
+
+def test_eviction_keeps_the_running_total_in_step(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PageCache(path, max_bytes=20000)
+    for i in range(200):
+        cache.put(f"https://example.org/{i}", os.urandom(500), f"https://example.org/{i}")
+    cache.put("https://example.org/199", os.urandom(100), "https://example.org/199")
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 20000
+    assert cache.get("https://example.org/0") is None
+    assert cache.get("https://example.org/199") is not None
+    cache.close()
+
+    reopened = PageCache(path, max_bytes=20000)
+    assert reopened._total == stats["bytes"]
+    reopened.close()
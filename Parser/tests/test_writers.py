@@ -0,0 +1,100 @@
+import csv
+import gzip
+import json
+import os
+
+import pytest
+
+from checkpoint import Checkpoint
+from parsing import Row
+from writers import CsvWriter, JsonlWriter, ParquetWriter
+
+ROW = Row("AWO Kindertagesstätte Sonnenschein", "awo-muenster.de", "kita@awo-muenster.de", "awo-muenster.de",
+          "Weiherstraße 5", "48143", "Münster", ("Kindertagesstätte", "Familienbildung"))
+
+
+def read_jsonl(path, compression):
+    if compression == "zstd":
+        import zstandard
+        with open(path, "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True).read()
+    else:
+        with gzip.open(path) as f:
+            data = f.read()
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_jsonl_append_after_crash_drops_only_the_page_in_flight(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    path = str(tmp_path / "rows.jsonl")
+    writer = JsonlWriter(path, compression=compression)
+    writer.write_rows([ROW, ROW])
+    writer.write_rows([ROW])
+    writer.close()
+    # A crash halfway through the next page leaves a truncated member behind.
+    with open(path, "rb") as f:
+        complete = f.read()
+    with open(path, "ab") as f:
+        f.write(gzip.compress(b'{"half": "a page"}\n' * 50)[:30])
+
+    writer = JsonlWriter(path, append=True, compression=compression)
+    writer.write_rows([ROW._replace(city="Bonn")])
+    writer.close()
+
+    records = read_jsonl(path, compression)
+    assert [record["city"] for record in records] == ["Münster"] * 3 + ["Bonn"]
+    assert records[0]["tags"] == ["Kindertagesstätte", "Familienbildung"]
+    with open(path, "rb") as f:
+        assert f.read().startswith(complete)
+
+
+def test_csv_resume_drops_rows_the_checkpoint_never_recorded(tmp_path):
+    path, checkpoint_path = str(tmp_path / "rows.csv"), str(tmp_path / "checkpoint.jsonl")
+    writer, checkpoint = CsvWriter(path), Checkpoint(checkpoint_path)
+    writer.write_rows([ROW, ROW])
+    checkpoint.mark_page(1, [], writer.offset)
+    # Killed after page 2's rows (the last one cut short) but before its checkpoint line.
+    writer.write_rows([ROW._replace(city="Bonn")])
+    writer._file.write('"AWO Ortsverein')
+    writer._file.flush()
+    checkpoint.close()
+
+    checkpoint = Checkpoint(checkpoint_path, resume=True)
+    writer = CsvWriter(path, append=True, truncate_to=checkpoint.offset)
+    writer.write_rows([ROW._replace(city="Köln")])
+    writer.close()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        records = list(csv.reader(f))
+    assert [record[6] for record in records[1:]] == ["Münster", "Münster", "Köln"]
+
+
+def test_csv_resume_without_offsets_keeps_the_file(tmp_path):
+    path, checkpoint_path = str(tmp_path / "rows.csv"), str(tmp_path / "checkpoint.jsonl")
+    writer = CsvWriter(path)
+    writer.write_rows([ROW])
+    writer.close()
+    with open(checkpoint_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"page": 1, "details": []}) + "\n")
+
+    checkpoint = Checkpoint(checkpoint_path, resume=True)
+    assert checkpoint.offset is None
+    size = os.path.getsize(path)
+    CsvWriter(path, append=True, truncate_to=checkpoint.offset).close()
+    assert os.path.getsize(path) == size
+
+
+def test_parquet_resume_removes_parts_the_checkpoint_never_recorded(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "rows.parquet")
+    writer = ParquetWriter(path, batch_rows=1)
+    writer.write_rows([ROW])
+    offset = writer.offset
+    writer.write_rows([ROW])
+
+    writer = ParquetWriter(path, append=True, batch_rows=1, truncate_to=offset)
+    assert sorted(os.listdir(path)) == ["part-00000.parquet"]
+    writer.write_rows([ROW])
+    assert sorted(os.listdir(path)) == ["part-00000.parquet", "part-00001.parquet"]
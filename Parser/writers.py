@@ -0,0 +1,244 @@
+import csv
+import glob
+import gzip
+import json
+import os
+import threading
+import zlib
+
+from parsing import FIELDNAMES, Row, flat_row
+
+FORMATS = ["csv", "jsonl.gz", "jsonl.zst", "parquet"]
+
+# Columns with few distinct values across hundreds of thousands of rows;
+# Parquet stores them dictionary-encoded so they load as categoricals.
+DICTIONARY_COLUMNS = {"company_domain", "email_domain", "postal_code", "city"}
+
+
+def make_parent(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def truncate(path, length, reason):
+    """Cut `path` back to `length` bytes if it is longer."""
+    if os.path.exists(path) and os.path.getsize(path) > length:
+        print(f"[WARNING] {path} {reason}; cutting it back to {length} bytes.")
+        with open(path, "r+b") as f:
+            f.truncate(length)
+
+
+def format_for_path(path):
+    for fmt in FORMATS:
+        if path.endswith("." + fmt):
+            return fmt
+    return "csv"
+
+
+class CsvWriter:
+    """Streams rows to a CSV file as pages complete.
+
+    With `append=True` an existing file is continued (header only written
+    for an empty file), otherwise it is started from scratch. `offset` is
+    the file size after the last write; appending with `truncate_to` first
+    drops whatever a crashed run wrote after the last checkpointed page.
+    """
+
+    def __init__(self, path, append=False, truncate_to=None):
+        self.path = path
+        self.rows_written = 0
+        self._lock = threading.Lock()
+
+        make_parent(path)
+        if append and truncate_to is not None:
+            truncate(path, truncate_to, "has rows of pages the checkpoint never recorded")
+        write_header = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(FIELDNAMES)
+        self._file.flush()
+        self.offset = self._file.buffer.tell()
+
+    def write_rows(self, rows):
+        """Write and flush `rows`; returns True once they are safely on disk."""
+        with self._lock:
+            self._writer.writerows(flat_row(row) for row in rows)
+            self._file.flush()
+            self.offset = self._file.buffer.tell()
+            self.rows_written += len(rows)
+        return True
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    """One JSON object per row with `tags` as a list, gzip or zstd compressed.
+
+    Every `write_rows` call is written as a complete gzip member / zstd
+    frame, and both formats read concatenated members as one stream.
+    Appending with `truncate_to` (the `offset` after the last checkpointed
+    page) drops every member written after it; without one the file is cut
+    back to its last complete member, so a member a crash left half-written
+    can't make the rest of the file unreadable.
+    """
+
+    def __init__(self, path, append=False, compression="gzip", truncate_to=None):
+        self.path = path
+        self.compression = compression
+        self.rows_written = 0
+        self._lock = threading.Lock()
+
+        make_parent(path)
+        if append and os.path.exists(path):
+            if truncate_to is None:
+                truncate(path, complete_length(path, compression),
+                         f"ends in an incomplete {compression} block from an interrupted run")
+            else:
+                truncate(path, truncate_to, "has rows of pages the checkpoint never recorded")
+        self._raw = open(path, "ab" if append else "wb")
+        self.offset = self._raw.tell()
+        if compression == "zstd":
+            import zstandard
+            self._zstd = zstandard
+            self._file = zstandard.ZstdCompressor(level=6).stream_writer(self._raw, closefd=False)
+
+    def write_rows(self, rows):
+        with self._lock:
+            payload = "".join(json.dumps(row._asdict(), ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+            if self.compression == "zstd":
+                self._file.write(payload)
+                self._file.flush(self._zstd.FLUSH_FRAME)
+            else:
+                with gzip.GzipFile(fileobj=self._raw, mode="ab", compresslevel=6) as member:
+                    member.write(payload)
+            self._raw.flush()
+            self.offset = self._raw.tell()
+            self.rows_written += len(rows)
+        return True
+
+    def close(self):
+        if self.compression == "zstd":
+            self._file.close()
+        self._raw.close()
+
+
+def complete_length(path, compression, chunk_size=1 << 20):
+    """Length of the leading part of `path` made of complete gzip members / zstd frames."""
+    if compression == "zstd":
+        import zstandard
+        new_decompressor = lambda: zstandard.ZstdDecompressor().decompressobj()
+        errors = (zstandard.ZstdError,)
+    else:
+        new_decompressor = lambda: zlib.decompressobj(zlib.MAX_WBITS | 16)
+        errors = (zlib.error,)
+
+    complete = offset = 0
+    decompressor = new_decompressor()
+    pending = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = pending or f.read(chunk_size)
+            pending = b""
+            if not chunk:
+                return complete
+            try:
+                decompressor.decompress(chunk)
+            except errors:
+                return complete
+            if decompressor.eof:
+                pending = decompressor.unused_data
+                offset += len(chunk) - len(pending)
+                complete = offset
+                decompressor = new_decompressor()
+            else:
+                offset += len(chunk)
+
+
+class ParquetWriter:
+    """Parquet dataset directory written in row-group batches.
+
+    Rows are buffered until `batch_rows` and then written as a new
+    `part-NNNNN.parquet` file, which is complete and readable as soon as it
+    is closed. Appending just adds parts after the existing ones; `offset`
+    is the number of parts written, and `truncate_to` removes the parts
+    after it. `tags` is a list<string> column and the domain/location
+    columns are dictionary-encoded.
+    """
+
+    def __init__(self, path, append=False, batch_rows=50000, truncate_to=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self.schema = pa.schema([
+            (name, pa.list_(pa.string()) if name == "tags"
+             else pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_COLUMNS
+             else pa.string())
+            for name in Row._fields
+        ])
+
+        os.makedirs(path, exist_ok=True)
+        existing = sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+        if not append:
+            for part in existing:
+                os.remove(part)
+            existing = []
+        elif truncate_to is not None:
+            for part in existing[truncate_to:]:
+                print(f"[WARNING] Removing {part}, which the checkpoint never recorded.")
+                os.remove(part)
+            existing = existing[:truncate_to]
+        self._next_part = int(os.path.basename(existing[-1])[5:10]) + 1 if existing else 0
+        self.offset = self._next_part
+
+    def write_rows(self, rows):
+        """Buffer `rows`; returns True when everything buffered so far was written out."""
+        with self._lock:
+            self._buffer.extend(rows)
+            self.rows_written += len(rows)
+            if len(self._buffer) < self.batch_rows:
+                return False
+            self._flush()
+            return True
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        columns = list(zip(*self._buffer))
+        table = self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type.value_type).dictionary_encode()
+             if self._pa.types.is_dictionary(field.type)
+             else self._pa.array(column, type=field.type)
+             for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        part = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        self._pq.write_table(table, part + ".tmp", compression="zstd", row_group_size=self.batch_rows)
+        os.replace(part + ".tmp", part)
+        self._next_part += 1
+        self.offset = self._next_part
+        self._buffer = []
+
+    def close(self):
+        with self._lock:
+            self._flush()
+
+
+def create_writer(path, fmt=None, append=False, truncate_to=None):
+    """Writer for `path`; `truncate_to` is the `offset` the checkpoint last recorded."""
+    fmt = fmt or format_for_path(path)
+    if fmt == "parquet":
+        return ParquetWriter(path, append=append, truncate_to=truncate_to)
+    if fmt == "jsonl.gz":
+        return JsonlWriter(path, append=append, compression="gzip", truncate_to=truncate_to)
+    if fmt == "jsonl.zst":
+        return JsonlWriter(path, append=append, compression="zstd", truncate_to=truncate_to)
+    return CsvWriter(path, append=append, truncate_to=truncate_to)